@@ -1,126 +1,466 @@
 # ai/mcts.py
 import math
+import multiprocessing
+import os
 import random
+import time
+import queue
+import threading
 import numpy as np
 import torch
-from copy import deepcopy
-from collections import defaultdict
+import warnings
+import weakref
+from collections import defaultdict, OrderedDict
+from concurrent.futures import Future
 
-class MCTSNode:
-    def __init__(self, game_state, parent=None, move=None, prior_prob=0.0):
+from ai.symmetry import SymmetricEvaluator
+from go_engine import scoring
+from go_engine.playout import light_playout, heavy_playout
+
+class MCTSTree:
+    """
+    NumPy配列で持つ探索木
+
+    ノードは整数IDで指し、訪問回数・累積値・事前確率・親・子の範囲を
+    あらかじめ確保した配列に格納する。ノードは局面を持たず、探索時に
+    ルートから手を打ち直して局面を再現する。
+
+    ノード0がルートで、あるノードの子は連続したIDに並ぶ。
+    各ノードの値は、そのノードへの手を打った側（親の手番）から見た値。
+
+    置換表を使う場合は、別の手順で同じ局面に着いたノードを展開済みの
+    ノードにつなぎ（target）、子ノードを共有する有向非巡回グラフになる。
+    親が一意でなくなるので、統計は探索でたどった経路に沿って更新する。
+    """
+
+    def __init__(self, capacity=1024):
         """
-        MCTSノードの初期化
-        
         Args:
-            game_state: ゲームの状態
-            parent: 親ノード
-            move: このノードに到達するための手
-            prior_prob: 事前確率（ニューラルネットワークから）
+            capacity: 最初に確保するノード数（足りなくなれば倍に広げる）
         """
-        self.game_state = game_state  # ゲーム状態のコピー
-        self.parent = parent
-        self.move = move  # このノードに到達した手
-        self.children = {}  # 子ノード {move: MCTSNode}
-        
-        # MCTS統計
-        self.visit_count = 0  # 訪問回数
-        self.value_sum = 0.0  # 累積値
-        self.prior_prob = prior_prob  # 事前確率
-        
-        # 展開済みかどうか
-        self.is_expanded = False
-        
-    def is_leaf(self):
-        """葉ノードかどうかを判定"""
-        return len(self.children) == 0
-    
-    def get_value(self):
+        self.num_nodes = 0
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.move = np.zeros(capacity, dtype=np.int32)  # 平坦インデックス（size*sizeはパス）
+        self.prior = np.zeros(capacity, dtype=np.float32)
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.value_sum = np.zeros(capacity, dtype=np.float64)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int32)
+        self.target = np.full(capacity, -1, dtype=np.int32)  # 子を共有する同一局面のノード
+
+        # 置換表 {局面のキー: 展開済みノード}
+        self.table = {}
+
+        # ルートノード
+        self._allocate(1)
+
+    def _allocate(self, count):
+        """ノードをcount個確保し、先頭のIDを返す"""
+        start = self.num_nodes
+        end = start + count
+        capacity = len(self.parent)
+        if end > capacity:
+            while capacity < end:
+                capacity *= 2
+            for name, fill in (("parent", -1), ("move", 0), ("prior", 0),
+                               ("visits", 0), ("value_sum", 0), ("first_child", -1),
+                               ("num_children", 0), ("target", -1)):
+                old = getattr(self, name)
+                new = np.full(capacity, fill, dtype=old.dtype)
+                new[:start] = old[:start]
+                setattr(self, name, new)
+        self.num_nodes = end
+        return start
+
+    def owner(self, node):
+        """nodeの子を持つノード（置換表でつないだ先、なければnode自身）"""
+        target = self.target[node]
+        return int(target) if target >= 0 else node
+
+    def is_expanded(self, node):
+        """展開済みかどうか"""
+        return self.first_child[self.owner(node)] >= 0
+
+    def children(self, node):
+        """子ノードのIDの範囲"""
+        owner = self.owner(node)
+        start = self.first_child[owner]
+        return range(start, start + self.num_children[owner])
+
+    def link(self, node, target):
+        """未展開のnodeを同じ局面の展開済みノードtargetにつなぐ"""
+        self.target[node] = target
+
+    def value(self, node):
         """平均値を取得"""
-        if self.visit_count == 0:
+        if self.visits[node] == 0:
             return 0.0
-        return self.value_sum / self.visit_count
-    
-    def select_child(self, c_puct=1.0):
+        return self.value_sum[node] / self.visits[node]
+
+    def expand(self, node, moves, priors):
         """
-        UCB1アルゴリズムで最適な子ノードを選択
-        
+        ノードを展開して子ノードを作成
+
+        子ノードには（手, 事前確率）だけを記録し、局面は作らない。
+        子の局面は選択でその子に降りたときに、手を打って初めて作られる。
+
         Args:
-            c_puct: 探索の強さを制御するパラメータ
-            
+            node: 展開するノード
+            moves: 合法手の平坦インデックスの配列
+            priors: 各手の事前確率
+        """
+        count = len(moves)
+        start = self._allocate(count)
+        end = start + count
+        self.parent[start:end] = node
+        self.move[start:end] = moves
+        self.prior[start:end] = priors
+        self.first_child[node] = start
+        self.num_children[node] = count
+
+    def backup(self, path, value):
+        """
+        バックプロパゲーション: 葉から根まで値を伝播
+
+        Args:
+            path: ルートから葉までにたどったノードのリスト
+            value: 葉ノードの手番側から見た評価値
+        """
+        for node in reversed(path):
+            # ノードの値は親の手番から見た値なので、符号を反転して加える
+            value = -value
+            self.visits[node] += 1
+            self.value_sum[node] += value
+
+    def find_child(self, node, move):
+        """
+        指定した手の子ノードを探す
+
+        Args:
+            node: 親ノード
+            move: 手の平坦インデックス
+
         Returns:
-            選択された子ノード
+            子ノードのID（なければ -1）
         """
-        best_score = -float('inf')
-        best_child = None
-        
-        for child in self.children.values():
-            # UCB1スコアの計算
-            # Q(s,a) + c_puct * P(s,a) * sqrt(N(s)) / (1 + N(s,a))
-            
-            exploitation = child.get_value()  # 活用項
-            
-            if child.visit_count == 0:
-                exploration = float('inf')  # 未訪問ノードは優先
-            else:
-                exploration = (c_puct * child.prior_prob * 
-                             math.sqrt(self.visit_count) / child.visit_count)
-            
-            score = exploitation + exploration
-            
-            if score > best_score:
-                best_score = score
-                best_child = child
-                
-        return best_child
-    
-    def expand(self, legal_moves, action_probs):
+        owner = self.owner(node)
+        start = self.first_child[owner]
+        if start < 0:
+            return -1
+        end = start + self.num_children[owner]
+        found = np.flatnonzero(self.move[start:end] == move)
+        return start + int(found[0]) if len(found) else -1
+
+    def subtree(self, node):
         """
-        ノードを展開して子ノードを作成
-        
+        nodeを根とする部分木を新しい木として取り出す（それ以外は捨てる）
+
         Args:
-            legal_moves: 合法手のリスト
-            action_probs: 各手の事前確率
+            node: 新しい根にするノード
+
+        Returns:
+            MCTSTree
         """
-        for move in legal_moves:
-            # 新しいゲーム状態を作成
-            new_game_state = deepcopy(self.game_state)
-            new_game_state.make_move(move)
-            
-            # 事前確率を取得
-            move_idx = self._move_to_index(move, new_game_state.board.size)
-            prior = action_probs[move_idx] if move_idx < len(action_probs) else 0.0
-            
-            # 子ノードを作成
-            child = MCTSNode(new_game_state, parent=self, move=move, prior_prob=prior)
-            self.children[move] = child
-            
-        self.is_expanded = True
-    
-    def backup(self, value):
+        tree = MCTSTree()
+        tree.visits[0] = self.visits[node]
+        tree.value_sum[0] = self.value_sum[node]
+        tree.prior[0] = self.prior[node]
+
+        # 幅優先で子のまとまりごとにコピーし、子が連続して並ぶ性質を保つ
+        mapping = {node: 0}
+        queue = [(self.owner(node), 0)]
+        for old, new in queue:
+            count = self.num_children[old]
+            if self.first_child[old] < 0:
+                continue
+            old_start = self.first_child[old]
+            start = tree._allocate(count)
+            src = slice(old_start, old_start + count)
+            dst = slice(start, start + count)
+            tree.parent[dst] = new
+            tree.move[dst] = self.move[src]
+            tree.prior[dst] = self.prior[src]
+            tree.visits[dst] = self.visits[src]
+            tree.value_sum[dst] = self.value_sum[src]
+            tree.first_child[new] = start
+            tree.num_children[new] = count
+            pairs = list(zip(range(old_start, old_start + count), range(start, start + count)))
+            mapping.update(pairs)
+            queue.extend(pairs)
+
+        # 置換表のつながりを付け替える（つなぎ先が部分木の外なら未展開に戻す）
+        for old, new in mapping.items():
+            target = self.target[old]
+            if target >= 0 and new != 0:
+                tree.target[new] = mapping.get(int(target), -1)
+        tree.table = {key: mapping[old] for key, old in self.table.items() if old in mapping}
+        return tree
+
+    def add_virtual_loss(self, path, virtual_loss):
         """
-        バックプロパゲーション: 値を親ノードに伝播
-        
+        葉から根までの経路に仮想損失を加える
+
+        評価待ちの経路を「訪問済みで負けた」ように見せ、同じバッチの中で
+        別の葉が選ばれるようにする。
+
         Args:
-            value: 評価値
+            path: ルートから葉までにたどったノードのリスト
+            virtual_loss: 1回分の仮想損失
         """
-        self.visit_count += 1
-        self.value_sum += value
-        
-        if self.parent:
-            # プレイヤーが変わるので値を反転
-            self.parent.backup(-value)
-    
-    def _move_to_index(self, move, board_size):
-        """手をインデックスに変換"""
-        if move is None:  # パス
-            return board_size * board_size
-        x, y = move
-        return x * board_size + y
+        for node in path:
+            self.visits[node] += 1
+            self.value_sum[node] -= virtual_loss
+
+    def revert_virtual_loss(self, path, virtual_loss):
+        """add_virtual_loss() で加えた仮想損失を取り除く"""
+        for node in path:
+            self.visits[node] -= 1
+            self.value_sum[node] += virtual_loss
+
+
+class EvaluationCache:
+    """
+    ニューラルネットワークの評価結果のLRUキャッシュ
+
+    局面のZobristハッシュと手番をキーに（行動確率, 価値）を保持する。
+    エントリ数が max_entries を超えると最も古く使われたものから捨てる。
+    保持する行動確率は読み取り専用で、変更する場合は copy() すること。
+
+    ネットワークの重みを更新したら clear() で結果を捨てること。
+    """
+
+    # 同じネットワークを使うプレイヤー間で共有するキャッシュ
+    _shared = weakref.WeakKeyDictionary()
+
+    def __init__(self, max_entries=None):
+        """
+        Args:
+            max_entries: 保持する最大エントリ数（Noneなら AI_CONFIG["mcts_cache_size"]）
+        """
+        if max_entries is None:
+            max_entries = _ai_config("mcts_cache_size", 50000)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @classmethod
+    def for_network(cls, neural_network, max_entries=None):
+        """
+        ネットワークごとに共有されるキャッシュを取得
+
+        Args:
+            neural_network: 評価に使うニューラルネットワーク
+            max_entries: 新しく作る場合の最大エントリ数
+
+        Returns:
+            そのネットワーク用の EvaluationCache
+        """
+        cache = cls._shared.get(neural_network)
+        if cache is None:
+            cache = cls(max_entries)
+            cls._shared[neural_network] = cache
+        return cache
+
+    @staticmethod
+    def key(game_state):
+        """局面のキー（Zobristハッシュ, 手番）"""
+        return game_state.position_hash, game_state.current_player
+
+    def get(self, key):
+        """
+        評価結果を取得
+
+        Returns:
+            (action_probs, value)、なければ None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, action_probs, value):
+        """評価結果を保存"""
+        if self.max_entries <= 0:
+            return
+        action_probs = np.asarray(action_probs, dtype=np.float32)
+        action_probs.flags.writeable = False
+        self._entries[key] = (action_probs, float(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """全てのエントリと統計を消す"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """ヒット率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _SearchBudget:
+    """
+    1回の探索のシミュレーション回数と思考時間の予算
+
+    最善手が残りの予算では逆転されない時点で打ち切り、時間切れの時点で
+    上位2手の訪問回数が拮抗していれば一度だけ時間を延長する。
+    """
+
+    # 2番手の訪問回数が最善手のこの割合以上なら拮抗しているとみなす
+    CLOSE_RATIO = 0.8
+
+    def __init__(self, num_simulations, time_limit=None, extend_time=0.0, early_stop=True,
+                 stop_event=None):
+        """
+        Args:
+            num_simulations: シミュレーション回数の上限
+            time_limit: 思考時間の上限（秒、Noneなら無制限）
+            extend_time: 拮抗時に延長する時間（time_limit に対する割合）
+            early_stop: 最善手が確定した時点で打ち切るか
+            stop_event: 外から探索を止めるための threading.Event（先読み用）
+        """
+        self.num_simulations = num_simulations
+        self.done = 0
+        self.in_flight = 0  # 並列探索で評価中のシミュレーション数
+        self.start = time.monotonic()
+        self.deadline = self.start + time_limit if time_limit else None
+        self.extension = time_limit * extend_time if time_limit else 0.0
+        self.early_stop = early_stop
+        self.stop_event = stop_event
+
+    def remaining(self):
+        """残りのシミュレーション回数"""
+        return self.num_simulations - self.done - self.in_flight
+
+    def exhausted(self, tree):
+        """
+        探索を打ち切るかどうか
+
+        Args:
+            tree: 探索木（ルートの子の訪問回数を見る）
+        """
+        if self.done + self.in_flight >= self.num_simulations:
+            return True
+        if self.stop_event is not None and self.stop_event.is_set():
+            return True
+        if self.deadline is None and not self.early_stop:
+            return False
+
+        children = tree.children(0)
+        counts = tree.visits[children.start:children.stop]
+        if len(counts) >= 2:
+            second, best = np.partition(counts, -2)[-2:]
+        else:
+            second, best = 0, (counts[0] if len(counts) else 0)
+
+        remaining = self.remaining()
+        if self.deadline is not None:
+            now = time.monotonic()
+            if now >= self.deadline:
+                if self.extension > 0 and second >= self.CLOSE_RATIO * best:
+                    # 上位2手が拮抗しているので一度だけ延長する
+                    self.deadline = now + self.extension
+                    self.extension = 0.0
+                else:
+                    return True
+            # これまでの速度から、残り時間で打てるシミュレーション回数を見積もる
+            rate = self.done / max(now - self.start, 1e-9)
+            remaining = min(remaining, rate * (self.deadline - now))
+
+        return self.early_stop and best - second > remaining
+
+
+class _InferenceQueue:
+    """
+    複数の探索スレッドから評価要求を受け取り、まとめてニューラル
+    ネットワークに通す
+
+    専用のスレッドが要求を最大 batch_size 個まで集めて1回の順伝播で
+    評価し、各要求の Future に (action_probs, value) を設定する。
+    """
+
+    def __init__(self, neural_network, batch_size, wait=0.001):
+        """
+        Args:
+            neural_network: 評価用ニューラルネットワーク
+            batch_size: 1回の順伝播で評価する最大の要求数
+            wait: 最初の要求が来てから他の要求を待つ時間（秒）
+        """
+        self.neural_network = neural_network
+        self.batch_size = batch_size
+        self.wait = wait
+        self._requests = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def evaluate(self, features):
+        """
+        局面を評価する（結果が出るまで待つ）
+
+        Args:
+            features: バッチ次元付きの特徴量テンソル
+
+        Returns:
+            action_probs: 行動確率分布
+            value: 手番側から見た状態価値
+        """
+        future = Future()
+        self._requests.put((features, future))
+        return future.result()
+
+    def close(self):
+        """評価スレッドを止める"""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                requests = [self._requests.get(timeout=0.01)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.wait
+            while len(requests) < self.batch_size:
+                try:
+                    requests.append(self._requests.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            try:
+                features = torch.cat([features for features, _ in requests])
+                with torch.no_grad():
+                    batch_probs, batch_values = self.neural_network(features)
+                batch_probs = batch_probs.cpu().numpy()
+                batch_values = batch_values.cpu().numpy().flatten()
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), action_probs, value in zip(requests, batch_probs, batch_values):
+                future.set_result((action_probs, float(value)))
 
 
 class MCTS:
     def __init__(self, neural_network=None, num_simulations=800, c_puct=1.0, 
-                 add_dirichlet_noise=False, dirichlet_alpha=0.03, dirichlet_epsilon=0.25):
+                 add_dirichlet_noise=False, dirichlet_alpha=0.03, dirichlet_epsilon=0.25,
+                 komi=scoring.DEFAULT_KOMI, fpu_reduction=None,
+                 batch_size=None, virtual_loss=1.0, cache=None, reuse_tree=False,
+                 transpositions=False, time_limit=None, extend_time=0.5, early_stop=True,
+                 num_threads=1, num_processes=1, playout=None,
+                 random_symmetry=None, average_root=None):
         """
         モンテカルロ木探索の初期化
         
@@ -131,6 +471,27 @@ class MCTS:
             add_dirichlet_noise: ディリクレノイズを追加するか
             dirichlet_alpha: ディリクレ分布のパラメータ
             dirichlet_epsilon: ノイズの混合比率
+            komi: 終局時の得点計算に使うコミ
+            fpu_reduction: 未訪問の子の価値を親の価値からどれだけ下げるか
+                           （Noneならネットワークがあれば AI_CONFIG["mcts_fpu_reduction"]、
+                           なければ未訪問の子を必ず1回ずつ試す）
+            batch_size: ニューラルネットワークでまとめて評価する葉の数
+                        （Noneなら AI_CONFIG["mcts_batch_size"]、1で逐次評価）
+            virtual_loss: バッチ収集中に評価待ちの経路へ加える仮想損失
+            cache: ニューラルネットワークの評価キャッシュ（Noneなら新しく作る）
+            reuse_tree: 前回の探索木のうち、その後に打たれた手の先の部分木を引き継ぐか
+            transpositions: 同じ局面のノードを置換表で合流させるか（DAG探索。
+                            合法手が手順によらない superko=False のゲームのみ）
+            time_limit: 1手の思考時間の上限（秒、Noneなら回数のみで制限）
+            extend_time: 上位2手が拮抗している場合に延長する時間（time_limit に対する割合）
+            early_stop: 最善手が残りの予算で逆転されなくなった時点で打ち切るか
+            num_threads: 1つの探索木を共有して探索するスレッド数
+            num_processes: ロールアウトのみの探索（neural_network=None）を独立に行うプロセス数
+            playout: ロールアウトの方策（"light" / "heavy"、Noneなら AI_CONFIG["mcts_playout"]）
+            random_symmetry: 葉の評価で局面ごとにランダムな対称変換をかけるか
+                             （Noneなら AI_CONFIG["mcts_random_symmetry"]）
+            average_root: ルートだけは8通りの対称変換をバッチ8で評価して平均するか
+                          （Noneなら AI_CONFIG["mcts_average_root"]）
         """
         self.neural_network = neural_network
         self.num_simulations = num_simulations
@@ -138,69 +499,591 @@ class MCTS:
         self.add_dirichlet_noise = add_dirichlet_noise
         self.dirichlet_alpha = dirichlet_alpha
         self.dirichlet_epsilon = dirichlet_epsilon
+        self.komi = komi
+        # 事前確率が一様なロールアウト探索で値を下げると、最初に試した子に探索が偏るので、
+        # fpu_reduction はネットワークの事前確率がある場合だけ使う
+        if fpu_reduction is None and neural_network is not None:
+            fpu_reduction = _ai_config("mcts_fpu_reduction", 0.25)
+        self.fpu_reduction = fpu_reduction
+        if batch_size is None:
+            batch_size = _ai_config("mcts_batch_size", 8)
+        self.batch_size = max(1, int(batch_size))
+        self.virtual_loss = virtual_loss
+        self.cache = cache if cache is not None else EvaluationCache()
+        self.reuse_tree = reuse_tree
+        self.transpositions = transpositions
+        self.time_limit = time_limit
+        self.extend_time = extend_time
+        self.early_stop = early_stop
+        self.num_threads = max(1, int(num_threads))
+        self.num_processes = max(1, int(num_processes))
+        if playout is None:
+            playout = _ai_config("mcts_playout", "light")
+        if playout not in ("light", "heavy"):
+            raise ValueError(f"Unknown playout: {playout}")
+        self.playout = playout
+        if random_symmetry is None:
+            random_symmetry = _ai_config("mcts_random_symmetry", True)
+        if average_root is None:
+            average_root = _ai_config("mcts_average_root", True)
+        self.average_root = average_root
+        # ネットワークの順伝播はすべてこの評価器を通す
+        self._evaluator = SymmetricEvaluator(neural_network, random_symmetry)
+        self._pool = None
+        self._pool_size = 0
         
-    def search(self, game_state):
+        # 前回の探索木とその根の局面（reuse_tree のとき）
+        self._tree = None
+        self._root_game = None
+        
+    def search(self, game_state, num_simulations=None, time_limit=None):
         """
         MCTSを実行して最適な手を探索
         
         Args:
             game_state: 現在のゲーム状態
+            num_simulations: シミュレーション回数の上限（Noneなら self.num_simulations）
+            time_limit: 思考時間の上限（秒、Noneなら self.time_limit）
             
         Returns:
             action_probs: 各手の確率分布
         """
-        # ルートノードを作成
-        root = MCTSNode(deepcopy(game_state))
+        if num_simulations is None:
+            num_simulations = self.num_simulations
+        if time_limit is None:
+            time_limit = self.time_limit
         
-        # 指定回数のシミュレーションを実行
-        for _ in range(self.num_simulations):
-            self._simulate(root)
+        # ロールアウトのみの探索はGILで並列化できないので、プロセスごとに独立に探索する
+        if self.num_processes > 1 and not self.neural_network:
+            action_counts = self._search_root_parallel(game_state, num_simulations, time_limit)
+        else:
+            tree = self._search_tree(game_state, num_simulations, time_limit)
+            action_counts = self._root_visit_counts(tree, game_state.board.size)
         
         # 訪問回数に基づいて行動確率を計算
-        return self._get_action_probs(root, game_state.board.size)
+        return self._get_action_probs(action_counts)
     
-    def _simulate(self, node):
+    def _search_tree(self, game_state, num_simulations, time_limit, stop_event=None):
         """
-        1回のMCTSシミュレーションを実行
+        探索木を作って予算の範囲でシミュレーションを実行
+        
+        Args:
+            game_state: 現在のゲーム状態
+            num_simulations: シミュレーション回数の上限
+            time_limit: 思考時間の上限（秒、Noneなら無制限）
+            stop_event: 立った時点で探索を打ち切る threading.Event（先読み用、
+                        指定した場合は最善手が確定しても打ち切らない）
+            
+        Returns:
+            探索後の MCTSTree
+        """
+        # 探索木は配列で持ち、局面は1つの作業用ゲームで手を打ち直して再現する
+        tree = self._reused_tree(game_state) if self.reuse_tree else None
+        if tree is None:
+            tree = MCTSTree()
+        game = game_state.clone()
+        
+        # ルートは8通りの対称変換の平均で展開する（その分もシミュレーション1回と数える）
+        if self.neural_network and self.average_root and not tree.is_expanded(0) and not game.game_over:
+            self._expand_root_averaged(tree, game)
+        
+        # 引き継いだ訪問回数の分だけシミュレーションを減らす
+        budget = _SearchBudget(max(num_simulations - int(tree.visits[0]), 1),
+                               time_limit, self.extend_time, self.early_stop and stop_event is None,
+                               stop_event)
+        
+        # 予算を使い切るか最善手が確定するまでシミュレーションを実行
+        batched = self.neural_network and self.batch_size > 1
+        if self.num_threads > 1:
+            self._search_threaded(tree, game_state, budget)
+        else:
+            while True:
+                if batched:
+                    # 仮想損失を使って複数の葉を集め、まとめて評価する
+                    budget.done += self._simulate_batch(tree, game, min(self.batch_size, budget.remaining()))
+                else:
+                    self._simulate(tree, game)
+                    budget.done += 1
+                if budget.exhausted(tree):
+                    break
+        
+        if self.reuse_tree:
+            self._tree = tree
+            self._root_game = game_state.clone()
+        
+        return tree
+    
+    def can_ponder(self):
+        """先読みした探索木を次の search() で引き継げるか（ルート並列探索は木を持たない）"""
+        return self.reuse_tree and not (self.num_processes > 1 and not self.neural_network)
+    
+    def ponder(self, game_state, stop_event, num_simulations=None):
+        """
+        相手の手番の局面を stop_event が立つまで探索する（先読み）
+        
+        探索木は reuse_tree と同じく保存されるので、相手が打った後の
+        search() はその手の先の部分木から探索を続ける。探索木を引き継げない
+        場合（reuse_tree=False、ルート並列探索）は何もしない。
+        
+        Args:
+            game_state: 相手の手番の局面（探索中に他から変更されないもの）
+            stop_event: 探索を止める threading.Event
+            num_simulations: シミュレーション回数の上限
+                             （Noneなら AI_CONFIG["mcts_ponder_simulations"]）
+        """
+        if not self.can_ponder() or game_state.game_over:
+            return
+        if num_simulations is None:
+            num_simulations = _ai_config("mcts_ponder_simulations", 20000)
+        self._search_tree(game_state, num_simulations, None, stop_event)
+    
+    def _search_root_parallel(self, game_state, num_simulations, time_limit):
+        """
+        num_processes 個のプロセスで独立に探索し、ルートの訪問回数を合算する（ルート並列）
+        
+        各プロセスには異なる乱数の種と、シミュレーション回数を等分した予算を渡す。
         
         Args:
-            node: 開始ノード
+            game_state: 現在のゲーム状態
+            num_simulations: 全プロセス合計のシミュレーション回数の上限
+            time_limit: 思考時間の上限（秒、Noneなら無制限）
+            
+        Returns:
+            合算した各手の訪問回数
         """
-        # 1. 選択フェーズ: 葉ノードまで選択
-        current = node
-        while not current.is_leaf() and not current.game_state.game_over:
-            current = current.select_child(self.c_puct)
+        # 1プロセスあたりのシミュレーションが少なすぎると探索にならないので、プロセス数を絞る
+        num_workers = max(1, min(self.num_processes, num_simulations // _MIN_SIMULATIONS_PER_PROCESS))
+        if self._pool is None or self._pool_size < num_workers:
+            self.close()
+            self._pool = multiprocessing.get_context().Pool(num_workers)
+            self._pool_size = num_workers
         
-        # 2. 展開フェーズ: 葉ノードを展開
-        if not current.game_state.game_over and not current.is_expanded:
-            legal_moves = current.game_state.get_legal_moves()
+        options = dict(
+            c_puct=self.c_puct, komi=self.komi, fpu_reduction=self.fpu_reduction,
+            transpositions=self.transpositions, extend_time=self.extend_time,
+            early_stop=self.early_stop, playout=self.playout,
+        )
+        seed = np.random.randint(2 ** 31)
+        tasks = [
+            (game_state, options, num_simulations // num_workers + (i < num_simulations % num_workers),
+             time_limit, seed + i)
+            for i in range(num_workers)
+        ]
+        return np.sum(self._pool.map(_root_parallel_search, tasks), axis=0)
+    
+    def close(self):
+        """ルート並列探索のプロセスプールを閉じる"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._pool_size = 0
+    
+    def reset(self):
+        """引き継ぐ探索木を捨てる（新しい対局を始めるときなど）"""
+        self._tree = None
+        self._root_game = None
+    
+    def _reused_tree(self, game_state):
+        """
+        前回の探索木から現在の局面を根とする部分木を取り出す
+        
+        前回の根の局面から手が進んだだけの場合に、その手順をたどった先の
+        部分木を返す。それ以外（別の対局、待った等）は None。
+        
+        履歴を戻さずに盤面だけを差し替えられた局面に別の局面の木を使わない
+        ように、前回の根から手順を打ち直した局面（ハッシュ・手番・パス数）が
+        現在の局面と一致することも確かめる。
+        
+        Args:
+            game_state: 現在のゲーム状態
             
+        Returns:
+            MCTSTree または None
+        """
+        tree, root_game = self._tree, self._root_game
+        if tree is None or root_game.board.size != game_state.board.size:
+            return None
+        
+        start = len(root_game.move_history)
+        if len(game_state.move_history) < start or game_state.move_history[:start] != root_game.move_history[:]:
+            return None
+        
+        board_size = game_state.board.size
+        game = root_game.clone()
+        node = 0
+        for move in game_state.move_history[start:]:
+            node = tree.find_child(node, _move_to_index(move, board_size))
+            if node < 0 or game.play(move) is None:
+                return None
+        
+        if not tree.is_expanded(node) or _position_key(game) != _position_key(game_state):
+            return None
+        if node != 0:
+            tree = tree.subtree(node)
+        
+        # 新しい根の事前確率にはノイズが入っていないので、ここで加える
+        if self.add_dirichlet_noise and node != 0:
+            children = tree.children(0)
+            priors = tree.prior[children.start:children.stop]
+            noise = np.random.dirichlet(self.dirichlet_alpha * np.ones(len(priors)))
+            tree.prior[children.start:children.stop] = (
+                (1 - self.dirichlet_epsilon) * priors + self.dirichlet_epsilon * noise)
+        
+        return tree
+    
+    def _expand_root_averaged(self, tree, game):
+        """
+        ルートを8通りの対称変換で評価した平均で展開してバックアップする
+
+        8通りはバッチ8の1回の順伝播でまとめて評価する。平均した評価は
+        キャッシュにも入れる。
+
+        Args:
+            tree: 未展開のルートを持つ探索木
+            game: ルート局面のゲーム
+        """
+        features = self._game_state_to_features(game)
+        with torch.no_grad():
+            action_probs, value = self._evaluator.evaluate_average(features)
+        action_probs = action_probs.cpu().numpy().flatten()
+        value = value.cpu().item()
+        self.cache.put(EvaluationCache.key(game), action_probs, value)
+
+        if self.add_dirichlet_noise:
+            action_probs = self._add_dirichlet_noise(action_probs)
+        self._expand(tree, 0, game.legal_mask(), action_probs, _transposition_key(game))
+        tree.backup([0], value)
+
+    def _simulate(self, tree, game):
+        """
+        1回のMCTSシミュレーションを実行
+        
+        Args:
+            tree: 探索木
+            game: ルート局面の作業用ゲーム（終了時には元の局面に戻す）
+        """
+        board_size = game.board.size
+        
+        # 1. 選択フェーズ: 手を打ちながら葉ノードまで降りる
+        path, undo_tokens = self._select_leaf(tree, game)
+        node = path[-1]
+        
+        # 2. 展開フェーズ: 葉ノードを評価して展開
+        if game.game_over:
+            value = self._evaluate_terminal_state(game)
+        else:
+            # 同じ局面の展開済みノードがあればそこにつなぎ、その値を使う
+            value = self._link_transposition(tree, path, game)
+        
+        if value is None:
             if self.neural_network:
                 # ニューラルネットワークで評価
-                action_probs, value = self._evaluate_with_network(current.game_state)
+                action_probs, value = self._evaluate_with_network(game)
             else:
                 # ランダムポリシー
-                board_size = current.game_state.board.size
                 action_probs = np.ones(board_size * board_size + 1) / (board_size * board_size + 1)
-                value = self._random_rollout(current.game_state)
+                value = self._random_rollout(game)
             
             # ディリクレノイズを追加（ルートノードのみ）
-            if self.add_dirichlet_noise and current == node:
+            if self.add_dirichlet_noise and node == 0:
                 action_probs = self._add_dirichlet_noise(action_probs)
             
-            current.expand(legal_moves, action_probs)
+            self._expand(tree, node, game.legal_mask(), action_probs, _transposition_key(game))
+        
+        # 3. バックプロパゲーション
+        tree.backup(path, value)
+        
+        _undo_all(game, undo_tokens)
+    
+    def _simulate_batch(self, tree, game, count):
+        """
+        仮想損失を使って最大count個の葉を集め、ニューラルネットワークで
+        まとめて評価してからバックアップする
+        
+        同じ葉が2度選ばれた時点で収集を打ち切る。
+        
+        Args:
+            tree: 探索木
+            game: ルート局面の作業用ゲーム（終了時には元の局面に戻す）
+            count: 集める葉の最大数
             
-        else:
-            # 終端ノードの場合
-            if current.game_state.game_over:
-                value = self._evaluate_terminal_state(current.game_state)
-            elif self.neural_network:
-                _, value = self._evaluate_with_network(current.game_state)
+        Returns:
+            実行したシミュレーション回数
+        """
+        done = 0
+        pending = []  # (経路, キャッシュのキー, 置換表のキー, 特徴量, 合法手マスク)
+        pending_nodes = set()
+        
+        while done < count:
+            path, undo_tokens = self._select_leaf(tree, game)
+            node = path[-1]
+            
+            if game.game_over:
+                # 終局した葉はその場で評価する
+                tree.backup(path, self._evaluate_terminal_state(game))
+                done += 1
+            elif node in pending_nodes:
+                _undo_all(game, undo_tokens)
+                break
             else:
-                value = self._random_rollout(current.game_state)
+                value = self._link_transposition(tree, path, game)
+                key = EvaluationCache.key(game)
+                cached = self.cache.get(key) if value is None else None
+                if value is not None:
+                    # 同じ局面の展開済みノードにつないだ
+                    tree.backup(path, value)
+                elif cached is not None:
+                    # キャッシュにあればネットワークを通さずに展開する
+                    action_probs, value = cached
+                    if self.add_dirichlet_noise and node == 0:
+                        action_probs = self._add_dirichlet_noise(action_probs)
+                    self._expand(tree, node, game.legal_mask(), action_probs, _transposition_key(game))
+                    tree.backup(path, value)
+                else:
+                    features = self._game_state_to_features(game)
+                    pending.append((path, key, _transposition_key(game), features, game.legal_mask()))
+                    pending_nodes.add(node)
+                    tree.add_virtual_loss(path, self.virtual_loss)
+                done += 1
+            
+            _undo_all(game, undo_tokens)
         
-        # 3. バックプロパゲーション
-        current.backup(value)
+        if not pending:
+            return done
+        
+        # バッチ1回の順伝播でまとめて評価
+        features = torch.cat([features for _, _, _, features, _ in pending])
+        with torch.no_grad():
+            batch_probs, batch_values = self._evaluator(features)
+        batch_probs = batch_probs.cpu().numpy()
+        batch_values = batch_values.cpu().numpy().flatten()
+        
+        for (path, key, position_key, _, legal_mask), action_probs, value in zip(pending, batch_probs, batch_values):
+            self.cache.put(key, action_probs, value)
+            
+            # ディリクレノイズを追加（ルートノードのみ）
+            node = path[-1]
+            if self.add_dirichlet_noise and node == 0:
+                action_probs = self._add_dirichlet_noise(action_probs)
+            
+            self._expand(tree, node, legal_mask, action_probs, position_key)
+            
+            # 仮想損失を取り除いてからバックアップ
+            tree.revert_virtual_loss(path, self.virtual_loss)
+            tree.backup(path, value)
+        
+        return done
+    
+    def _search_threaded(self, tree, game_state, budget):
+        """
+        num_threads 個のスレッドで1つの探索木を共有して探索する（木並列）
+        
+        木の選択・展開・バックアップは1つのロックの中で短く行い、時間の
+        かかる葉の評価（ニューラルネットワーク・ロールアウト）はロックの外で
+        行う。評価待ちの経路には仮想損失を加えて、スレッド同士が別の葉を
+        選ぶようにする。ニューラルネットワークの評価は _InferenceQueue で
+        スレッドをまたいでまとめる。
+        
+        Args:
+            tree: 探索木
+            game_state: ルートの局面
+            budget: 探索の予算
+        """
+        lock = threading.Condition()
+        pending_nodes = set()
+        errors = []
+        inference = None
+        if self.neural_network:
+            inference = _InferenceQueue(self._evaluator, max(self.batch_size, self.num_threads))
+        
+        def worker():
+            try:
+                search_loop()
+            except Exception as e:
+                errors.append(e)
+                with lock:
+                    lock.notify_all()
+        
+        def search_loop():
+            game = game_state.clone()
+            while not errors:
+                with lock:
+                    if budget.exhausted(tree):
+                        return
+                    path, undo_tokens = self._select_leaf(tree, game)
+                    node = path[-1]
+                    
+                    value = None
+                    if game.game_over:
+                        value = self._evaluate_terminal_state(game)
+                    elif node in pending_nodes:
+                        # 他のスレッドが評価中の葉なので、バックアップを待って選び直す
+                        _undo_all(game, undo_tokens)
+                        lock.wait(0.01)
+                        continue
+                    else:
+                        value = self._link_transposition(tree, path, game)
+                    
+                    if value is not None:
+                        tree.backup(path, value)
+                        budget.done += 1
+                        lock.notify_all()
+                        _undo_all(game, undo_tokens)
+                        continue
+                    
+                    key = EvaluationCache.key(game)
+                    cached = self.cache.get(key) if inference else None
+                    pending_nodes.add(node)
+                    tree.add_virtual_loss(path, self.virtual_loss)
+                    budget.in_flight += 1
+                
+                # 葉の評価はロックの外で行う
+                legal_mask = game.legal_mask()
+                position_key = _transposition_key(game)
+                if cached is not None:
+                    action_probs, value = cached
+                elif inference:
+                    action_probs, value = inference.evaluate(self._game_state_to_features(game))
+                else:
+                    board_size = game.board.size
+                    action_probs = np.ones(board_size * board_size + 1) / (board_size * board_size + 1)
+                    value = self._random_rollout(game)
+                _undo_all(game, undo_tokens)
+                
+                with lock:
+                    tree.revert_virtual_loss(path, self.virtual_loss)
+                    budget.in_flight -= 1
+                    if inference and cached is None:
+                        self.cache.put(key, action_probs, value)
+                    
+                    # ディリクレノイズを追加（ルートノードのみ）
+                    if self.add_dirichlet_noise and node == 0:
+                        action_probs = self._add_dirichlet_noise(action_probs)
+                    
+                    self._expand(tree, node, legal_mask, action_probs, position_key)
+                    tree.backup(path, value)
+                    pending_nodes.discard(node)
+                    budget.done += 1
+                    lock.notify_all()
+        
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(self.num_threads)]
+        try:
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        finally:
+            if inference:
+                inference.close()
+        
+        if errors:
+            raise errors[0]
+    
+    def _select_leaf(self, tree, game):
+        """
+        ルートから手を打ちながら未展開または終局の葉ノードまで降りる
+        
+        Args:
+            tree: 探索木
+            game: ルート局面の作業用ゲーム（葉の局面まで進む）
+            
+        Returns:
+            path: ルートから葉までにたどったノードのリスト
+            undo_tokens: ルート局面に戻すためのトークンのリスト
+        """
+        board_size = game.board.size
+        node = 0
+        path = [node]
+        undo_tokens = []
+        while tree.is_expanded(node) and not game.game_over:
+            node = self._select_child(tree, node)
+            path.append(node)
+            move = _index_to_move(tree.move[node], board_size)
+            undo_tokens.append(game.play(move, check_legal=False))
+        return path, undo_tokens
+    
+    def _select_child(self, tree, node):
+        """
+        PUCTで最適な子ノードを選択
+
+        子ノードの統計は連続した配列に並んでいるので、全ての子のスコアを
+        1つのNumPy式で計算してargmaxを取る。
+
+        Args:
+            tree: 探索木
+            node: 親ノード
+            
+        Returns:
+            選択された子ノードのID
+        """
+        owner = tree.owner(node)
+        start = tree.first_child[owner]
+        end = start + tree.num_children[owner]
+        visits = tree.visits[start:end]
+        
+        # つないだノードでは子が他の経路の訪問も含むので、子の訪問回数から N(s) を求める
+        parent_visits = tree.visits[node] if owner == node else 1 + int(visits.sum())
+        
+        # 活用項 Q(s,a)。未訪問の子は親の値から fpu_reduction を引いた値で代用する
+        # （親ノードの値は親の手番の相手側から見た値なので符号を反転する）。
+        # fpu_reduction が None なら未訪問の子を無限大として先に1回ずつ試す
+        if self.fpu_reduction is None:
+            fpu_value = math.inf
+        else:
+            fpu_value = -tree.value(node) - self.fpu_reduction
+        q = np.where(visits > 0, tree.value_sum[start:end] / np.maximum(visits, 1), fpu_value)
+        
+        # 探索項 c_puct * P(s,a) * sqrt(N(s)) / (1 + N(s,a))
+        u = self.c_puct * tree.prior[start:end] * math.sqrt(parent_visits) / (1 + visits)
+        
+        return start + int(np.argmax(q + u))
+    
+    def _expand(self, tree, node, legal_mask, action_probs, position_key=None):
+        """
+        ノードを合法手で展開
+        
+        Args:
+            tree: 探索木
+            node: 展開するノード
+            legal_mask: ノードの局面の合法手マスク（長さ size*size+1）
+            action_probs: 各手の事前確率（長さ size*size+1）
+            position_key: 置換表に登録する局面のキー
+        """
+        moves = np.flatnonzero(legal_mask)
+        priors = action_probs[moves]
+        total = priors.sum()
+        priors = priors / total if total > 0 else np.full(len(moves), 1.0 / len(moves))
+        tree.expand(node, moves, priors)
+        if self.transpositions and position_key is not None:
+            tree.table.setdefault(position_key, node)
+    
+    def _link_transposition(self, tree, path, game):
+        """
+        置換表に同じ局面の展開済みノードがあれば、葉をそこにつなぐ
+        
+        Args:
+            tree: 探索木
+            path: ルートから葉までにたどったノードのリスト
+            game: 葉の局面
+            
+        Returns:
+            つないだ場合は葉の手番側から見た評価値、それ以外は None
+        """
+        # 超コウでは合法手が局面だけでなく手順（局面履歴）にもよるので、別の手順の
+        # 合法手で作った子を共有できない。局面だけで合法手が決まる場合に限ってつなぐ
+        if not self.transpositions or game.superko:
+            return None
+        node = path[-1]
+        target = tree.table.get(_transposition_key(game))
+        if target is None or target == node or not tree.is_expanded(target):
+            return None
+        # 経路上の局面につなぐと循環するのでつながない
+        if any(tree.owner(n) == target for n in path):
+            return None
+        tree.link(node, target)
+        # ノードの値は同じ手番の側（手を打った側）から見た値なので、葉の手番側に直す
+        return -tree.value(target)
     
     def _evaluate_with_network(self, game_state):
         """
@@ -211,55 +1094,49 @@ class MCTS:
             
         Returns:
             action_probs: 行動確率分布
-            value: 状態価値
+            value: 手番側から見た状態価値
         """
+        key = EvaluationCache.key(game_state)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
         # ゲーム状態を特徴量に変換
         features = self._game_state_to_features(game_state)
         
         with torch.no_grad():
-            # ニューラルネットワークで予測
-            action_probs, value = self.neural_network(features)
+            # ニューラルネットワークで予測（価値は手番側から見た値で学習している）
+            action_probs, value = self._evaluator(features)
             
             # テンソルをnumpy配列に変換
             action_probs = action_probs.cpu().numpy().flatten()
             value = value.cpu().item()
-            
-            # 現在のプレイヤーに応じて値を調整
-            if game_state.current_player == -1:  # 白の場合
-                value = -value
-                
+        
+        self.cache.put(key, action_probs, value)
         return action_probs, value
     
     def _random_rollout(self, game_state):
         """
         ランダムロールアウトで終局まで対局
         
+        Game は使わず、軽量なプレイアウト専用エンジンで盤面だけを進める。
+        playout="heavy" では直前の手の周囲を3x3パターンの重みで選ぶ。
+        
         Args:
-            game_state: ゲーム状態
+            game_state: ゲーム状態（変更しない）
             
         Returns:
-            結果（勝ち: 1, 負け: -1, 引き分け: 0）
+            手番側から見た結果（勝ち: 1, 負け: -1, 引き分け: 0）
         """
-        temp_state = deepcopy(game_state)
-        original_player = temp_state.current_player
+        if game_state.game_over:
+            return self._evaluate_terminal_state(game_state)
         
-        # 最大手数を制限（無限ループ防止）
-        max_moves = temp_state.board.size * temp_state.board.size * 2
-        
-        for _ in range(max_moves):
-            if temp_state.game_over:
-                break
-                
-            legal_moves = temp_state.get_legal_moves()
-            if not legal_moves:
-                break
-                
-            # ランダムに手を選択
-            move = random.choice(legal_moves)
-            temp_state.make_move(move)
-        
-        # ゲーム結果を評価
-        return self._evaluate_terminal_state(temp_state) * (1 if original_player == temp_state.current_player else -1)
+        if self.playout == "heavy":
+            playout = heavy_playout(game_state.board.size)
+        else:
+            playout = light_playout(game_state.board.size)
+        return playout.run(game_state.board, game_state.current_player, self.komi,
+                           passes=game_state.passes)
     
     def _evaluate_terminal_state(self, game_state):
         """
@@ -271,16 +1148,8 @@ class MCTS:
         Returns:
             評価値
         """
-        # 簡単なスコアリング（実際の囲碁ルールより簡略化）
-        black_stones = np.sum(game_state.board.board == 1)
-        white_stones = np.sum(game_state.board.board == -1)
-        
-        if black_stones > white_stones:
-            return 1.0 if game_state.current_player == 1 else -1.0
-        elif white_stones > black_stones:
-            return 1.0 if game_state.current_player == -1 else -1.0
-        else:
-            return 0.0
+        # エリア方式（石＋地、コミ込み）で手番側から見た勝敗
+        return scoring.evaluate(game_state.board, game_state.current_player, self.komi)
     
     def _game_state_to_features(self, game_state):
         """
@@ -306,12 +1175,8 @@ class MCTS:
         # チャンネル2: 空の場所
         features[2] = (game_state.board.board == 0).astype(np.float32)
         
-        # チャンネル3: 合法手
-        legal_moves = game_state.get_legal_moves()
-        for move in legal_moves:
-            if move is not None:  # パス以外
-                x, y = move
-                features[3, x, y] = 1.0
+        # チャンネル3: 合法手（パス以外）
+        features[3] = game_state.legal_mask()[:-1].reshape(board_size, board_size)
         
         # チャンネル4-16: その他の特徴（履歴、アタリ状況など）
         # 簡略化のため、定数で埋める
@@ -333,25 +1198,33 @@ class MCTS:
         noise = np.random.dirichlet(self.dirichlet_alpha * np.ones(len(action_probs)))
         return (1 - self.dirichlet_epsilon) * action_probs + self.dirichlet_epsilon * noise
     
-    def _get_action_probs(self, root, board_size, temperature=1.0):
+    def _root_visit_counts(self, tree, board_size):
         """
-        ルートノードから行動確率を計算
+        ルートの各手の訪問回数を取得
         
         Args:
-            root: ルートノード
+            tree: 探索木
             board_size: 盤面サイズ
-            temperature: 温度パラメータ（0で決定論的）
             
         Returns:
-            行動確率分布
+            長さ size*size+1 の訪問回数の配列
         """
         action_counts = np.zeros(board_size * board_size + 1)
+        children = tree.children(0)
+        action_counts[tree.move[children.start:children.stop]] = tree.visits[children.start:children.stop]
+        return action_counts
+    
+    def _get_action_probs(self, action_counts, temperature=1.0):
+        """
+        ルートの訪問回数から行動確率を計算
         
-        # 各子ノードの訪問回数を取得
-        for move, child in root.children.items():
-            move_idx = child._move_to_index(move, board_size) if move else board_size * board_size
-            action_counts[move_idx] = child.visit_count
-        
+        Args:
+            action_counts: 各手の訪問回数（長さ size*size+1）
+            temperature: 温度パラメータ（0で決定論的）
+            
+        Returns:
+            行動確率分布
+        """
         if temperature == 0:
             # 決定論的選択
             action_probs = np.zeros_like(action_counts)
@@ -364,17 +1237,19 @@ class MCTS:
         
         return action_probs
     
-    def get_best_move(self, game_state):
+    def get_best_move(self, game_state, num_simulations=None, time_limit=None):
         """
         最適な手を取得
         
         Args:
             game_state: 現在のゲーム状態
+            num_simulations: シミュレーション回数の上限（Noneなら self.num_simulations）
+            time_limit: 思考時間の上限（秒、Noneなら self.time_limit）
             
         Returns:
             最適な手
         """
-        action_probs = self.search(game_state)
+        action_probs = self.search(game_state, num_simulations, time_limit)
         best_action_idx = np.argmax(action_probs)
         
         board_size = game_state.board.size
@@ -390,15 +1265,101 @@ class MCTS:
 class MCTSPlayer:
     """MCTSを使用するプレイヤー"""
     
-    def __init__(self, neural_network=None, num_simulations=800, c_puct=1.0):
-        self.mcts = MCTS(neural_network, num_simulations, c_puct)
+    def __init__(self, neural_network=None, num_simulations=800, c_puct=1.0, share_cache=False,
+                 reuse_tree=True, transpositions=False, time_limit=None, num_threads=1,
+                 num_processes=None, ponder=False):
+        """
+        Args:
+            neural_network: 評価用ニューラルネットワーク
+            num_simulations: シミュレーション回数
+            c_puct: UCBの探索パラメータ
+            share_cache: 同じネットワークを使う他のプレイヤーと評価キャッシュを共有するか
+            reuse_tree: 次の手番で前回の探索木を引き継ぐか
+            transpositions: 同じ局面のノードを合流させるか（superko=False のゲームのみ）
+            time_limit: 1手の思考時間の上限（秒、Noneなら回数のみで制限）
+            num_threads: 探索木を共有して探索するスレッド数
+            num_processes: ネットワークなしの場合に独立に探索するプロセス数
+                           （Noneなら AI_CONFIG["mcts_processes"]、それもNoneなら全コア。
+                           2以上ではプロセスプールを使うので、使い終わったら close() を呼ぶ）
+            ponder: 相手の手番の間もバックグラウンドで探索を続けるか（start_pondering）。
+                    探索木を引き継げない設定（reuse_tree=False、ルート並列探索）では
+                    警告を出して無効にする
+        """
+        cache = None
+        if share_cache and neural_network is not None:
+            cache = EvaluationCache.for_network(neural_network)
+        self.mcts = MCTS(neural_network, num_simulations, c_puct, cache=cache, reuse_tree=reuse_tree,
+                         transpositions=transpositions, time_limit=time_limit,
+                         num_threads=num_threads, num_processes=_num_processes(num_processes))
+        if ponder and not self.mcts.can_ponder():
+            warnings.warn("ponder=True cannot be combined with reuse_tree=False or root-parallel search "
+                          "(num_processes > 1 without a network); pondering is disabled", RuntimeWarning)
+            ponder = False
+        self.ponder = ponder
+        self._ponder_thread = None
+        self._ponder_stop = None
+    
+    @property
+    def num_simulations(self):
+        """1手のシミュレーション回数の上限"""
+        return self.mcts.num_simulations
+    
+    @num_simulations.setter
+    def num_simulations(self, value):
+        self.mcts.num_simulations = value
+    
+    @property
+    def time_limit(self):
+        """1手の思考時間の上限（秒、Noneなら無制限）"""
+        return self.mcts.time_limit
+    
+    @time_limit.setter
+    def time_limit(self, value):
+        self.mcts.time_limit = value
         
+    def start_pondering(self, game_state):
+        """
+        相手の手番の間、バックグラウンドのスレッドで game_state を探索し続ける
+        
+        次の get_move() で先読みを止め、相手が打った手の先の部分木から探索を
+        続ける。ponder=False の場合は何もしない。
+        
+        Args:
+            game_state: 相手の手番の局面（複製して探索するので、この後に手を打ってよい）
+        """
+        if not self.ponder:
+            return
+        self.stop_pondering()
+        self._ponder_stop = threading.Event()
+        self._ponder_thread = threading.Thread(
+            target=self.mcts.ponder, args=(game_state.clone(), self._ponder_stop), daemon=True)
+        self._ponder_thread.start()
+    
+    def stop_pondering(self):
+        """先読みを止め、探索木が保存されるまで待つ"""
+        if self._ponder_thread is None:
+            return
+        self._ponder_stop.set()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        
+    def close(self):
+        """
+        先読みを止め、ルート並列探索のプロセスプールを閉じる
+        
+        プレイヤーを捨てる・入れ替えるときに呼ぶ（その後も使えば必要に応じて作り直す）。
+        """
+        self.stop_pondering()
+        self.mcts.close()
+    
     def get_move(self, game_state):
         """手を取得"""
+        self.stop_pondering()
         return self.mcts.get_best_move(game_state)
     
     def get_action_probs(self, game_state, temperature=1.0):
         """行動確率分布を取得（学習用）"""
+        self.stop_pondering()
         action_probs = self.mcts.search(game_state)
         
         if temperature == 0:
@@ -410,4 +1371,136 @@ class MCTSPlayer:
         else:
             # 温度を適用
             action_probs = action_probs ** (1.0 / temperature)
-            return action_probs / np.sum(action_probs)
\ No newline at end of file
+            return action_probs / np.sum(action_probs)
+
+
+# ルート並列探索で1プロセスに割り当てる最小のシミュレーション回数
+_MIN_SIMULATIONS_PER_PROCESS = 16
+
+
+def _root_parallel_search(task):
+    """
+    ルート並列探索のワーカー（プロセスプールから呼ばれる）
+    
+    Args:
+        task: (局面, MCTSの設定, シミュレーション回数, 思考時間, 乱数の種)
+        
+    Returns:
+        ルートの各手の訪問回数
+    """
+    game_state, options, num_simulations, time_limit, seed = task
+    random.seed(seed)
+    np.random.seed(seed)
+    mcts = MCTS(None, num_simulations, **options)
+    tree = mcts._search_tree(game_state, num_simulations, time_limit)
+    return mcts._root_visit_counts(tree, game_state.board.size)
+
+
+def _num_processes(num_processes):
+    """ルート並列探索のプロセス数を決める（Noneなら設定値、それもNoneなら全コア）"""
+    if num_processes is None:
+        num_processes = _ai_config("mcts_processes", 1)
+    if num_processes is None:
+        num_processes = os.cpu_count() or 1
+    return num_processes
+
+
+def _index_to_move(index, board_size):
+    """平坦インデックスを着手（(x, y) または パスの場合 None）に変換"""
+    if index == board_size * board_size:
+        return None
+    return divmod(int(index), board_size)
+
+
+def _move_to_index(move, board_size):
+    """着手（(x, y) または パスの場合 None）を平坦インデックスに変換"""
+    if move is None:
+        return board_size * board_size
+    x, y = move
+    return x * board_size + y
+
+
+def _position_key(game):
+    """探索木を引き継げるかを判定するための局面のキー（ハッシュ, 手番, 連続パス数）"""
+    return (game.position_hash, game.current_player, game.passes)
+
+
+def _transposition_key(game):
+    """置換表のキー（手番・コウ込みのZobristハッシュ, 連続パス数）"""
+    return game.position_hash, game.passes
+
+
+def _undo_all(game, undo_tokens):
+    """play() のトークンを逆順に取り消してゲームを元の局面に戻す"""
+    for token in reversed(undo_tokens):
+        game.undo(token)
+
+
+def _ai_config(key, default):
+    """AI_CONFIG の設定値を取得（config が読めない場合は既定値）"""
+    try:
+        from config import AI_CONFIG
+    except ImportError:
+        return default
+    return AI_CONFIG.get(key, default)
+
+
+def benchmark_backup(depths=(50, 100, 200, 300), repeat=2000):
+    """
+    経路を使ったループのバックアップと、親をたどる再帰のバックアップ
+    （旧 MCTSNode.backup と同じ方式）の速度を比較
+
+    Args:
+        depths: 比較する木の深さ
+        repeat: 計測の繰り返し回数
+
+    Returns:
+        {深さ: 速度比（再帰の時間 / ループの時間）}
+    """
+    import sys
+    import timeit
+
+    class RecursiveNode:
+        def __init__(self, parent=None):
+            self.parent = parent
+            self.visit_count = 0
+            self.value_sum = 0.0
+
+        def backup(self, value):
+            self.visit_count += 1
+            self.value_sum += value
+            if self.parent:
+                self.parent.backup(-value)
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, max(depths) + 100))
+    speedups = {}
+    try:
+        for depth in depths:
+            leaf = RecursiveNode()
+            for _ in range(depth):
+                leaf = RecursiveNode(leaf)
+
+            # 1本の鎖状の木を作り、ルートから葉までの経路を記録する
+            tree = MCTSTree()
+            path = [0]
+            for _ in range(depth):
+                child = tree._allocate(1)
+                tree.parent[child] = path[-1]
+                tree.first_child[path[-1]] = child
+                tree.num_children[path[-1]] = 1
+                path.append(child)
+
+            recursive_time = timeit.timeit(lambda: leaf.backup(1.0), number=repeat) / repeat
+            loop_time = timeit.timeit(lambda: tree.backup(path, 1.0), number=repeat) / repeat
+            speedups[depth] = recursive_time / loop_time
+
+            print(f"深さ {depth}: 再帰 {recursive_time * 1e6:.1f} µs, ループ {loop_time * 1e6:.1f} µs, "
+                  f"速度比 {speedups[depth]:.1f}x")
+    finally:
+        sys.setrecursionlimit(limit)
+    return speedups
+
+
+if __name__ == "__main__":
+    benchmark_backup()
@@ -4,6 +4,8 @@ import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
 
+from ai.symmetry import SymmetricEvaluator
+
 class ResidualBlock(nn.Module):
     """残差ブロック - AlphaGoで使用される基本ブロック"""
     
@@ -94,12 +96,14 @@ class ImprovedGoNeuralNetwork(nn.Module):
                 nn.init.normal_(m.weight, 0, 0.01)
                 nn.init.constant_(m.bias, 0)
     
-    def predict(self, game_state):
+    def predict(self, game_state, symmetry=None):
         """
         ゲーム状態から予測を行う
         
         Args:
             game_state: ゲーム状態
+            symmetry: 盤面の対称変換（None: 元の向き, "random": ランダムな1つ,
+                      "average": 8通りをバッチ8で評価して平均）
             
         Returns:
             action_probs: 行動確率
@@ -109,9 +113,74 @@ class ImprovedGoNeuralNetwork(nn.Module):
         features = self._game_state_to_features(game_state)
         
         with torch.no_grad():
-            action_probs, value = self.forward(features)
+            if symmetry is None:
+                action_probs, value = self.forward(features)
+            elif symmetry == "random":
+                action_probs, value = SymmetricEvaluator(self)(features)
+            elif symmetry == "average":
+                action_probs, value = SymmetricEvaluator(self).evaluate_average(features)
+            else:
+                raise ValueError(f"Unknown symmetry: {symmetry}")
             return action_probs.cpu().numpy().flatten(), value.cpu().item()
     
+    def predict_batch(self, game_batch, random_symmetry=False):
+        """
+        GameBatch の全局面をまとめて予測
+        
+        Args:
+            game_batch: go_engine.batch.GameBatch
+            random_symmetry: 局面ごとにランダムな対称変換をかけて評価するか
+            
+        Returns:
+            action_probs: 行動確率 (N, size*size+1)
+            values: 状態価値 (N,)
+        """
+        features = self._game_batch_to_features(game_batch)
+        
+        # 学習中のモデルでも呼べるように、評価モードは予測の間だけにする
+        training = self.training
+        self.eval()
+        try:
+            with torch.no_grad():
+                action_probs, values = SymmetricEvaluator(self, random_symmetry)(features)
+        finally:
+            self.train(training)
+        return action_probs.cpu().numpy(), values.cpu().numpy().flatten()
+    
+    def _game_batch_to_features(self, game_batch):
+        """GameBatch を特徴量に変換（_game_state_to_features と同じチャンネル構成）"""
+        board_size = game_batch.board_size
+        boards = game_batch.board.boards
+        num_games = len(game_batch)
+        current_player = game_batch.current_player.reshape(num_games, 1, 1).astype(np.float32)
+        _, group_sizes, liberties = game_batch.board.strings()
+        black = boards == 1
+        white = boards == -1
+        
+        features = np.zeros((num_games, 17, board_size, board_size), dtype=np.float32)
+        features[:, 0] = boards == current_player
+        features[:, 1] = boards == -current_player
+        features[:, 2] = boards == 0
+        # チャンネル3-6: 履歴（GameBatchは履歴を持たないので0）
+        features[:, 7] = game_batch.legal_mask()[:, :-1].reshape(num_games, board_size, board_size)
+        features[:, 8] = current_player
+        
+        # チャンネル9-14: 連のサイズ・アタリ・呼吸点数
+        group_feature = np.minimum(group_sizes / 10.0, 1.0)
+        features[:, 9] = np.where(black, group_feature, 0)
+        features[:, 10] = np.where(white, group_feature, 0)
+        features[:, 11] = black & (liberties == 1)
+        features[:, 12] = white & (liberties == 1)
+        liberty_feature = np.minimum(liberties / 8.0, 1.0)
+        features[:, 13] = np.where(black, liberty_feature, 0)
+        features[:, 14] = np.where(white, liberty_feature, 0)
+        
+        self._add_distance_features(features[0, 15], board_size)
+        features[:, 15] = features[0, 15]
+        features[:, 16] = 1.0
+        
+        return torch.from_numpy(features)
+    
     def _game_state_to_features(self, game_state):
         """ゲーム状態を特徴量に変換"""
         board_size = game_state.board.size
@@ -140,19 +209,14 @@ class ImprovedGoNeuralNetwork(nn.Module):
             features[5] = (prev_board == current_player).astype(np.float32)
             features[6] = (prev_board == -current_player).astype(np.float32)
         
-        # チャンネル7: 合法手マスク
-        legal_moves = game_state.get_legal_moves()
-        for move in legal_moves:
-            if move is not None:  # パス以外
-                x, y = move
-                if 0 <= x < board_size and 0 <= y < board_size:
-                    features[7, x, y] = 1.0
+        # チャンネル7: 合法手マスク（パス以外）
+        features[7] = game_state.legal_mask()[:-1].reshape(board_size, board_size)
         
         # チャンネル8: 現在のプレイヤー（全面に1または-1）
         features[8] = np.full((board_size, board_size), current_player, dtype=np.float32)
         
         # チャンネル9-10: 石の集合（連）の情報
-        self._add_group_features(features[9:11], game_state.board.board, board_size)
+        self._add_group_features(features[9:11], game_state.board, board_size)
         
         # チャンネル11-12: アタリ（取られそうな石）の情報
         self._add_atari_features(features[11:13], game_state, board_size)
@@ -170,50 +234,46 @@ class ImprovedGoNeuralNetwork(nn.Module):
     
     def _add_group_features(self, features, board, board_size):
         """石の集合（連）の特徴を追加"""
-        visited = np.zeros((board_size, board_size), dtype=bool)
-        
-        for i in range(board_size):
-            for j in range(board_size):
-                if not visited[i, j] and board[i, j] != 0:
-                    group = self._get_group(board, i, j, board_size)
-                    group_size = len(group)
-                    
-                    # グループサイズに基づく特徴
-                    for x, y in group:
-                        visited[x, y] = True
-                        if board[x, y] == 1:  # 黒
-                            features[0, x, y] = min(group_size / 10.0, 1.0)
-                        else:  # 白
-                            features[1, x, y] = min(group_size / 10.0, 1.0)
+        cells = board.cells
+        
+        for p in range(board_size * board_size):
+            if cells[p] != 0:
+                # 連のサイズは盤面側で管理されているのでO(1)で取得できる
+                x, y = divmod(p, board_size)
+                group_size = board.string_size(p)
+                if cells[p] == 1:  # 黒
+                    features[0, x, y] = min(group_size / 10.0, 1.0)
+                else:  # 白
+                    features[1, x, y] = min(group_size / 10.0, 1.0)
     
     def _add_atari_features(self, features, game_state, board_size):
         """アタリ（取られそうな石）の特徴を追加"""
-        board = game_state.board.board
+        board = game_state.board
+        cells = board.cells
         
-        for i in range(board_size):
-            for j in range(board_size):
-                if board[i, j] != 0:
-                    liberties = self._count_liberties(board, i, j, board_size)
-                    if liberties == 1:  # アタリ状態
-                        if board[i, j] == 1:  # 黒
-                            features[0, i, j] = 1.0
-                        else:  # 白
-                            features[1, i, j] = 1.0
+        for p in range(board_size * board_size):
+            if cells[p] != 0 and board.liberty_count(p) == 1:  # アタリ状態
+                x, y = divmod(p, board_size)
+                if cells[p] == 1:  # 黒
+                    features[0, x, y] = 1.0
+                else:  # 白
+                    features[1, x, y] = 1.0
     
     def _add_liberty_features(self, features, game_state, board_size):
         """呼吸点（リバティ）数の特徴を追加"""
-        board = game_state.board.board
-        
-        for i in range(board_size):
-            for j in range(board_size):
-                if board[i, j] != 0:
-                    liberties = self._count_liberties(board, i, j, board_size)
-                    liberty_feature = min(liberties / 8.0, 1.0)  # 正規化
-                    
-                    if board[i, j] == 1:  # 黒
-                        features[0, i, j] = liberty_feature
-                    else:  # 白
-                        features[1, i, j] = liberty_feature
+        board = game_state.board
+        cells = board.cells
+        
+        for p in range(board_size * board_size):
+            if cells[p] != 0:
+                x, y = divmod(p, board_size)
+                liberties = board.liberty_count(p)
+                liberty_feature = min(liberties / 8.0, 1.0)  # 正規化
+                
+                if cells[p] == 1:  # 黒
+                    features[0, x, y] = liberty_feature
+                else:  # 白
+                    features[1, x, y] = liberty_feature
     
     def _add_distance_features(self, feature, board_size):
         """エッジからの距離特徴を追加"""
@@ -221,45 +281,6 @@ class ImprovedGoNeuralNetwork(nn.Module):
             for j in range(board_size):
                 distance_to_edge = min(i, j, board_size - 1 - i, board_size - 1 - j)
                 feature[i, j] = distance_to_edge / (board_size // 2)
-    
-    def _get_group(self, board, start_x, start_y, board_size):
-        """指定位置から始まる連を取得"""
-        color = board[start_x, start_y]
-        if color == 0:
-            return set()
-        
-        group = set()
-        stack = [(start_x, start_y)]
-        
-        while stack:
-            x, y = stack.pop()
-            if (x, y) in group:
-                continue
-                
-            group.add((x, y))
-            
-            # 隣接する同色の石を探す
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < board_size and 0 <= ny < board_size and
-                    board[nx, ny] == color and (nx, ny) not in group):
-                    stack.append((nx, ny))
-        
-        return group
-    
-    def _count_liberties(self, board, x, y, board_size):
-        """指定位置の石の連の呼吸点数を数える"""
-        group = self._get_group(board, x, y, board_size)
-        liberties = set()
-        
-        for gx, gy in group:
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx, ny = gx + dx, gy + dy
-                if (0 <= nx < board_size and 0 <= ny < board_size and
-                    board[nx, ny] == 0):
-                    liberties.add((nx, ny))
-        
-        return len(liberties)
 
 
 class NetworkTrainer:
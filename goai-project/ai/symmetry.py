@@ -0,0 +1,112 @@
+# ai/symmetry.py
+"""
+盤面の8通りの対称変換（回転4通り × 左右反転の有無）を使った評価
+
+特徴量を対称変換してからニューラルネットワークに通し、出力された方策を
+逆変換して元の向きに戻す。価値は向きによらないのでそのまま使う。
+"""
+import numpy as np
+import torch
+
+NUM_SYMMETRIES = 8
+
+
+def transform_features(features, symmetry):
+    """
+    特徴量に対称変換をかける
+
+    Args:
+        features: (N, C, size, size) の特徴量テンソル
+        symmetry: 変換の番号（0-7。4以上は左右反転してから回転）
+
+    Returns:
+        変換後の特徴量テンソル
+    """
+    if symmetry >= 4:
+        features = torch.flip(features, dims=[3])
+    return torch.rot90(features, symmetry % 4, dims=[2, 3])
+
+
+def inverse_transform_policy(action_probs, symmetry, board_size):
+    """
+    変換した局面での方策を元の向きに戻す（パスはそのまま）
+
+    Args:
+        action_probs: (N, size*size+1) の行動確率テンソル
+        symmetry: transform_features に渡した変換の番号
+        board_size: 盤面サイズ
+
+    Returns:
+        元の向きでの行動確率テンソル
+    """
+    n = action_probs.size(0)
+    board = action_probs[:, :-1].reshape(n, board_size, board_size)
+    board = torch.rot90(board, -(symmetry % 4), dims=[1, 2])
+    if symmetry >= 4:
+        board = torch.flip(board, dims=[2])
+    return torch.cat([board.reshape(n, -1), action_probs[:, -1:]], dim=1)
+
+
+class SymmetricEvaluator:
+    """
+    ニューラルネットワークを包み、対称変換した局面で評価する
+
+    呼び出し方と戻り値はネットワークの順伝播と同じなので、逐次評価・
+    バッチ評価・_InferenceQueue のどれにもそのまま渡せる。
+    """
+
+    def __init__(self, neural_network, random_symmetry=True):
+        """
+        Args:
+            neural_network: 評価用ニューラルネットワーク
+            random_symmetry: 局面ごとにランダムな対称変換をかけるか（Falseなら元の向きのみ）
+        """
+        self.neural_network = neural_network
+        self.random_symmetry = random_symmetry
+
+    def __call__(self, features):
+        """
+        局面ごとにランダムな対称変換をかけ、まとめて1回の順伝播で評価
+
+        Args:
+            features: (N, C, size, size) の特徴量テンソル
+
+        Returns:
+            action_probs: 元の向きでの行動確率 (N, size*size+1)
+            values: 状態価値 (N, 1)
+        """
+        if not self.random_symmetry:
+            return self.neural_network(features)
+
+        symmetries = np.random.randint(NUM_SYMMETRIES, size=features.size(0))
+        transformed = torch.cat([
+            transform_features(features[i:i + 1], symmetry) for i, symmetry in enumerate(symmetries)
+        ])
+        action_probs, values = self.neural_network(transformed)
+
+        board_size = features.size(-1)
+        action_probs = torch.cat([
+            inverse_transform_policy(action_probs[i:i + 1], symmetry, board_size)
+            for i, symmetry in enumerate(symmetries)
+        ])
+        return action_probs, values
+
+    def evaluate_average(self, features):
+        """
+        1つの局面の8通りの変換をバッチ8の1回の順伝播で評価して平均する
+
+        Args:
+            features: (1, C, size, size) の特徴量テンソル
+
+        Returns:
+            action_probs: 平均した行動確率 (1, size*size+1)
+            values: 平均した状態価値 (1, 1)
+        """
+        transformed = torch.cat([transform_features(features, s) for s in range(NUM_SYMMETRIES)])
+        action_probs, values = self.neural_network(transformed)
+
+        board_size = features.size(-1)
+        action_probs = torch.cat([
+            inverse_transform_policy(action_probs[s:s + 1], s, board_size) for s in range(NUM_SYMMETRIES)
+        ])
+        return action_probs.mean(dim=0, keepdim=True), values.mean(dim=0, keepdim=True)
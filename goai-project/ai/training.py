@@ -6,11 +6,11 @@ from collections import deque
 import pickle
 import os
 from tqdm import tqdm
-from copy import deepcopy
 
 from .network import ImprovedGoNeuralNetwork, NetworkTrainer
 from .mcts import MCTSPlayer
 from go_engine.game import Game
+from go_engine import scoring
 
 class SelfPlayTrainingSystem:
     """自己対戦による学習システム"""
@@ -172,7 +172,7 @@ class SelfPlayTrainingSystem:
         
         while not game.game_over and move_count < max_moves:
             # 現在の状態を保存
-            current_state = deepcopy(game)
+            current_state = game.clone()
             
             # 温度パラメータ（序盤は高く、終盤は低く）
             temperature = 1.0 if move_count < self.training_config['temperature_threshold'] else 0.1
@@ -223,7 +223,7 @@ class SelfPlayTrainingSystem:
     
     def determine_winner(self, game):
         """
-        ゲームの勝者を決定（簡単なスコアリング）
+        ゲームの勝者を決定（エリア方式、コミは scoring.DEFAULT_KOMI）
         
         Args:
             game: ゲーム状態
@@ -231,26 +231,11 @@ class SelfPlayTrainingSystem:
         Returns:
             勝者 (1: 黒, -1: 白, 0: 引き分け)
         """
-        board = game.board.board
-        black_stones = np.sum(board == 1)
-        white_stones = np.sum(board == -1)
-        
-        # 簡単な地の計算（空点を最も近い色に割り当て）
-        black_territory, white_territory = self.count_territory(game)
-        
-        black_score = black_stones + black_territory
-        white_score = white_stones + white_territory + 6.5  # コミ
-        
-        if black_score > white_score:
-            return 1  # 黒の勝ち
-        elif white_score > black_score:
-            return -1  # 白の勝ち
-        else:
-            return 0  # 引き分け
+        return scoring.winner(game.board)
     
     def count_territory(self, game):
         """
-        簡単な地の計算
+        地の計算
         
         Args:
             game: ゲーム状態
@@ -258,66 +243,7 @@ class SelfPlayTrainingSystem:
         Returns:
             (黒の地, 白の地)
         """
-        board = game.board.board
-        visited = np.zeros_like(board, dtype=bool)
-        black_territory = 0
-        white_territory = 0
-        
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                if board[i, j] == 0 and not visited[i, j]:
-                    # 空点から始まる領域を探索
-                    territory, owner = self.flood_fill_territory(board, i, j, visited)
-                    
-                    if owner == 1:  # 黒の地
-                        black_territory += territory
-                    elif owner == -1:  # 白の地
-                        white_territory += territory
-        
-        return black_territory, white_territory
-    
-    def flood_fill_territory(self, board, start_x, start_y, visited):
-        """
-        Flood fillで地を計算
-        
-        Args:
-            board: 盤面
-            start_x, start_y: 開始位置
-            visited: 訪問済みマスク
-            
-        Returns:
-            (地の大きさ, 所有者)
-        """
-        if board[start_x, start_y] != 0 or visited[start_x, start_y]:
-            return 0, 0
-        
-        territory_points = []
-        stack = [(start_x, start_y)]
-        neighboring_colors = set()
-        
-        while stack:
-            x, y = stack.pop()
-            if visited[x, y]:
-                continue
-                
-            visited[x, y] = True
-            territory_points.append((x, y))
-            
-            # 隣接する点をチェック
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.board_size and 0 <= ny < self.board_size:
-                    if board[nx, ny] == 0 and not visited[nx, ny]:
-                        stack.append((nx, ny))
-                    elif board[nx, ny] != 0:
-                        neighboring_colors.add(board[nx, ny])
-        
-        # 地の所有者を決定
-        if len(neighboring_colors) == 1:
-            owner = next(iter(neighboring_colors))
-            return len(territory_points), owner
-        else:
-            return 0, 0  # 中立地
+        return scoring.territory(game.board)
     
     def train_network(self):
         """
@@ -28,13 +28,23 @@ GAME_CONFIG = {
     "supported_board_sizes": [9, 13, 19],
     "default_komi": 6.5,
     "time_limit": None,  # 秒数、Noneで無制限
+    "board_backend": "numpy",  # "numpy", "bitboard"（9路・13路向け）
+    "supported_board_backends": ["numpy", "bitboard"],
 }
 
 # ===== AI設定 =====
 AI_CONFIG = {
     "model_file": "final_model.pt",
     "mcts_simulations": 100,
+    "mcts_batch_size": 8,  # ニューラルネットワークでまとめて評価する葉の数（1で逐次）
+    "mcts_processes": 1,  # ネットワークなしの探索に使うプロセス数（1でルート並列なし、Noneで全コア）
+    "mcts_playout": "light",  # ロールアウトの方策（"light": 一様ランダム, "heavy": 3x3パターン）
+    "mcts_random_symmetry": True,  # 葉の評価で局面ごとにランダムな対称変換をかける
+    "mcts_average_root": True,  # ルートは8通りの対称変換の平均で評価する
+    "mcts_ponder_simulations": 20000,  # 相手の手番中の先読みのシミュレーション回数の上限
     "mcts_c_puct": 1.0,
+    "mcts_cache_size": 50000,  # 評価キャッシュの最大エントリ数（0で無効）
+    "mcts_fpu_reduction": 0.25,  # 未訪問の子の価値 = 親の価値 - この値（ネットワーク使用時のみ）
     "neural_network": {
         "input_channels": 17,
         "residual_blocks": 5,
@@ -125,6 +135,12 @@ def load_env_overrides():
         except ValueError:
             pass
     
+    # 盤面の実装
+    if "GOAI_BOARD_BACKEND" in os.environ:
+        backend = os.environ["GOAI_BOARD_BACKEND"]
+        if backend in GAME_CONFIG["supported_board_backends"]:
+            GAME_CONFIG["board_backend"] = backend
+    
     # MCTS シミュレーション回数
     if "GOAI_MCTS_SIMS" in os.environ:
         try:
@@ -152,10 +168,20 @@ def validate_config():
     if GAME_CONFIG["default_board_size"] not in GAME_CONFIG["supported_board_sizes"]:
         errors.append(f"Invalid board size: {GAME_CONFIG['default_board_size']}")
     
+    # 盤面の実装の検証
+    if GAME_CONFIG["board_backend"] not in GAME_CONFIG["supported_board_backends"]:
+        errors.append(f"Invalid board backend: {GAME_CONFIG['board_backend']}")
+    
     # AIシミュレーション回数の検証
     if AI_CONFIG["mcts_simulations"] <= 0:
         errors.append(f"MCTS simulations must be positive: {AI_CONFIG['mcts_simulations']}")
     
+    if AI_CONFIG["mcts_batch_size"] <= 0:
+        errors.append(f"MCTS batch size must be positive: {AI_CONFIG['mcts_batch_size']}")
+    
+    if AI_CONFIG["mcts_playout"] not in ("light", "heavy"):
+        errors.append(f"Invalid MCTS playout: {AI_CONFIG['mcts_playout']}")
+    
     if errors:
         raise ValueError("Configuration errors:\n" + "\n".join(errors))
 
@@ -167,6 +193,7 @@ if __name__ == "__main__":
     print(f"Project: {PROJECT_NAME} v{VERSION}")
     print(f"Root: {PROJECT_ROOT}")
     print(f"Board size: {GAME_CONFIG['default_board_size']}")
+    print(f"Board backend: {GAME_CONFIG['board_backend']}")
     print(f"MCTS sims: {AI_CONFIG['mcts_simulations']}")
     
     # ディレクトリ作成
@@ -0,0 +1,362 @@
+# go_engine/batch.py
+"""
+複数局面の一括処理
+
+N局の盤面を1つの (N, size, size) の np.int8 配列として持ち、着手・
+合法手マスク・取り上げを全局まとめて配列演算で行う。得点計算は
+go_engine.scoring と同じ判定を盤面ごとに行う。
+自己対戦や評価を数千局並行で進め、ニューラルネットワークに大きな
+バッチで入力するために使う。
+
+コウは単純コウのみ扱い、超コウ判定は行わない。
+"""
+import numpy as np
+
+from .board import EMPTY, BLACK, WHITE, BORDER
+from . import scoring
+
+
+def _shift(grid, fill):
+    """
+    上下左右の隣接点の値を並べた4枚の配列を返す
+
+    Args:
+        grid: (N, size, size) の配列
+        fill: 盤外の値
+
+    Returns:
+        (上, 下, 左, 右) の隣接点の値
+    """
+    padded = np.pad(grid, ((0, 0), (1, 1), (1, 1)), constant_values=fill)
+    return (padded[:, :-2, 1:-1], padded[:, 2:, 1:-1],
+            padded[:, 1:-1, :-2], padded[:, 1:-1, 2:])
+
+
+def label_regions(grid, member):
+    """
+    同じ値で繋がった点の集合にラベルを付ける（全盤面一括）
+
+    各点のラベルは属する領域内で最小の通し番号。隣接点との最小値の
+    伝播とポインタジャンプを収束するまで繰り返す。
+
+    Args:
+        grid: (N, size, size) の配列
+        member: ラベルを付ける点のマスク（それ以外のラベルは N*size*size）
+
+    Returns:
+        (N, size, size) の np.int32 ラベル配列
+    """
+    total = grid.size
+    labels = np.where(member, np.arange(total, dtype=np.int32).reshape(grid.shape), np.int32(total))
+    connect_v = member[:, 1:, :] & member[:, :-1, :] & (grid[:, 1:, :] == grid[:, :-1, :])
+    connect_h = member[:, :, 1:] & member[:, :, :-1] & (grid[:, :, 1:] == grid[:, :, :-1])
+
+    while True:
+        new = labels.copy()
+        v = np.where(connect_v, np.minimum(labels[:, 1:, :], labels[:, :-1, :]), np.int32(total))
+        h = np.where(connect_h, np.minimum(labels[:, :, 1:], labels[:, :, :-1]), np.int32(total))
+        np.minimum(new[:, 1:, :], v, out=new[:, 1:, :])
+        np.minimum(new[:, :-1, :], v, out=new[:, :-1, :])
+        np.minimum(new[:, :, 1:], h, out=new[:, :, 1:])
+        np.minimum(new[:, :, :-1], h, out=new[:, :, :-1])
+
+        # ポインタジャンプ：ラベルが指す点のラベルを辿って収束を速める
+        flat = np.append(new.reshape(-1), np.int32(total))
+        new = flat[new]
+
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+class BoardBatch:
+    """N枚の盤面をまとめて扱う"""
+
+    def __init__(self, num_boards, size=9):
+        self.size = size
+        self.boards = np.zeros((num_boards, size, size), dtype=np.int8)
+
+        # 呼吸点数マップのキャッシュ（計算時の盤面と一致する間だけ使う）
+        self._cached_boards = None
+        self._cached_liberties = None
+
+    def __len__(self):
+        return self.boards.shape[0]
+
+    def strings(self):
+        """
+        全盤面の連のラベル・石数・呼吸点数を計算
+
+        Returns:
+            labels: 各点の連のラベル（空点は N*size*size）
+            sizes: 各点の石が属する連の石数（空点は0）
+            liberties: 各点の石が属する連の呼吸点数（空点は0）
+        """
+        boards = self.boards
+        total = boards.size
+        stones = boards != EMPTY
+        labels = label_regions(boards, stones)
+
+        sizes = np.bincount(labels.reshape(-1), minlength=total + 1)
+        sizes[total] = 0
+
+        # 各空点が接する連を重複なく数える
+        empty = ~stones
+        counts = np.zeros(total + 1, dtype=np.int64)
+        neighbors = _shift(labels, total)
+        for i, labels_i in enumerate(neighbors):
+            valid = empty & (labels_i < total)
+            for labels_j in neighbors[:i]:
+                valid &= labels_i != labels_j
+            counts += np.bincount(labels_i[valid], minlength=total + 1)
+        counts[total] = 0
+
+        return labels, sizes[labels], counts[labels]
+
+    def liberties(self):
+        """
+        各点の石が属する連の呼吸点数（空点は0）
+
+        Returns:
+            (N, size, size) の配列
+        """
+        if self._cached_boards is None or not np.array_equal(self._cached_boards, self.boards):
+            self._store_liberties(self.strings()[2])
+        return self._cached_liberties
+
+    def _store_liberties(self, liberties):
+        """呼吸点数マップを現在の盤面に対するキャッシュとして保存"""
+        self._cached_boards = self.boards.copy()
+        self._cached_liberties = liberties
+
+    def legal_mask(self, colors, ko=None):
+        """
+        全盤面の合法手マスク（自殺手・単純コウを除く）
+
+        Args:
+            colors: 各盤面の手番 (N,)
+            ko: 各盤面のコウの点の平坦インデックス (N,)、なければ-1
+
+        Returns:
+            (N, size*size+1) のbool配列（最後の列はパス）
+        """
+        boards = self.boards
+        n = len(self)
+        liberties = self.liberties()
+        colors = np.asarray(colors).reshape(n, 1, 1)
+
+        empty = boards == EMPTY
+        breathing = (empty | ((boards == colors) & (liberties > 1))
+                     | ((boards == -colors) & (liberties == 1)))
+        up, down, left, right = _shift(breathing, False)
+        legal = empty & (up | down | left | right)
+
+        mask = np.ones((n, self.size * self.size + 1), dtype=bool)
+        mask[:, :-1] = legal.reshape(n, -1)
+        if ko is not None:
+            ko = np.asarray(ko)
+            has_ko = np.flatnonzero(ko >= 0)
+            mask[has_ko, ko[has_ko]] = False
+        return mask
+
+    def place(self, indices, points, colors):
+        """
+        石を置いて取り上げを行う（合法性は呼び出し側で確認）
+
+        Args:
+            indices: 着手する盤面の番号
+            points: 着手点の平坦インデックス
+            colors: 着手する石の色
+
+        Returns:
+            captured: 盤面ごとの取り上げた石数 (N,)
+            ko: 盤面ごとの新しいコウの点（なければ-1） (N,)
+        """
+        n = len(self)
+        size = self.size
+        flat = self.boards.reshape(n, -1)
+        flat[indices, points] = colors
+
+        mover = np.zeros(n, dtype=np.int8)
+        mover[indices] = colors
+        _, _, liberties = self.strings()
+        dead = (self.boards == -mover.reshape(n, 1, 1)) & (mover.reshape(n, 1, 1) != 0) & (liberties == 0)
+        captured = dead.reshape(n, -1).sum(axis=1)
+        self.boards[dead] = EMPTY
+
+        # 取り上げのあった盤面だけ呼吸点数を計算し直してキャッシュする
+        changed = np.flatnonzero(captured)
+        if len(changed):
+            subset = BoardBatch.__new__(BoardBatch)
+            subset.size = size
+            subset.boards = self.boards[changed]
+            liberties[changed] = subset.strings()[2]
+        self._store_liberties(liberties)
+
+        # 1子を取り、打った石が孤立した1子で呼吸点が1つならコウ
+        ko = np.full(n, -1, dtype=np.int64)
+        single = indices[captured[indices] == 1]
+        if len(single):
+            single_points = points[captured[indices] == 1]
+            neighbors = np.stack(_shift(self.boards, BORDER), axis=-1).reshape(n, size * size, 4)
+            around = neighbors[single, single_points]
+            own = mover[single].reshape(-1, 1)
+            is_ko = ~(around == own).any(axis=1) & ((around == EMPTY).sum(axis=1) == 1)
+            ko[single[is_ko]] = np.argmax(dead.reshape(n, -1)[single[is_ko]], axis=1)
+
+        return captured, ko
+
+    def eye_mask(self, colors):
+        """
+        各盤面の手番側の眼（ロールアウトで埋めるべきでない点）のマスク
+
+        Args:
+            colors: 各盤面の手番 (N,)
+
+        Returns:
+            (N, size, size) のbool配列
+        """
+        boards = self.boards
+        colors = np.asarray(colors).reshape(len(self), 1, 1)
+        surrounded = boards == EMPTY
+        for neighbor in _shift(boards, BORDER):
+            surrounded &= (neighbor == colors) | (neighbor == BORDER)
+
+        # 斜めの相手の石が多すぎる場合は欠け眼（盤端では1つでも欠け眼）
+        padded = np.pad(boards, ((0, 0), (1, 1), (1, 1)), constant_values=BORDER)
+        diagonals = (padded[:, :-2, :-2], padded[:, :-2, 2:], padded[:, 2:, :-2], padded[:, 2:, 2:])
+        enemies = sum((d == -colors).astype(np.int8) for d in diagonals)
+        on_edge = sum((d == BORDER).astype(np.int8) for d in diagonals) > 0
+        return surrounded & np.where(on_edge, enemies == 0, enemies <= 1)
+
+    def territory_owner(self):
+        """
+        全盤面の地の所有者マップ（一色だけに囲まれた空点をその色とする）
+
+        判定は scoring.ownership と共通（scoring.ownership_grids）。
+
+        Returns:
+            (N, size, size) の配列（BLACK / WHITE / 中立・石は EMPTY）
+        """
+        return np.where(self.boards == EMPTY, scoring.ownership_grids(self.boards), EMPTY).astype(np.int8)
+
+    def area_scores(self, komi=scoring.DEFAULT_KOMI):
+        """
+        全盤面のエリア方式の得点差（黒 - 白 - コミ）
+
+        Args:
+            komi: コミ
+
+        Returns:
+            (N,) の得点差
+        """
+        area = scoring.ownership_grids(self.boards)
+        black = (area == BLACK).reshape(len(self), -1).sum(axis=1)
+        white = (area == WHITE).reshape(len(self), -1).sum(axis=1)
+        return black - white - komi
+
+
+class GameBatch:
+    """N局の対局を同時に進める"""
+
+    def __init__(self, num_games, board_size=9, komi=scoring.DEFAULT_KOMI, max_moves=None):
+        """
+        初期化
+
+        Args:
+            num_games: 対局数
+            board_size: 盤面サイズ
+            komi: コミ
+            max_moves: 最大手数（Noneなら board_size*board_size*2）
+        """
+        self.board = BoardBatch(num_games, board_size)
+        self.board_size = board_size
+        self.komi = komi
+        self.max_moves = max_moves if max_moves is not None else board_size * board_size * 2
+
+        self.current_player = np.full(num_games, BLACK, dtype=np.int8)
+        self.passes = np.zeros(num_games, dtype=np.int32)
+        self.move_count = np.zeros(num_games, dtype=np.int32)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.ko = np.full(num_games, -1, dtype=np.int64)
+        self.captured_stones = {BLACK: np.zeros(num_games, dtype=np.int64),
+                                WHITE: np.zeros(num_games, dtype=np.int64)}
+
+        # 合法手マスクのキャッシュ（手が進むと無効化）
+        self._legal_mask = None
+
+    def __len__(self):
+        return len(self.board)
+
+    def legal_mask(self):
+        """
+        全局の合法手マスク（終局した対局は全てFalse）
+
+        Returns:
+            (N, size*size+1) のbool配列（最後の列はパス）
+        """
+        if self._legal_mask is None:
+            mask = self.board.legal_mask(self.current_player, self.ko)
+            mask[self.game_over] = False
+            self._legal_mask = mask
+        return self._legal_mask
+
+    def play(self, moves):
+        """
+        全局で1手ずつ進める
+
+        Args:
+            moves: 各局の着手の平坦インデックス (N,)（size*size はパス）
+
+        Returns:
+            各局で手が実行されたか (N,)（終局済み・不正な手はFalse）
+        """
+        num_points = self.board_size * self.board_size
+        moves = np.asarray(moves, dtype=np.int64)
+        games = np.arange(len(self))
+        success = self.legal_mask()[games, moves]
+
+        is_pass = success & (moves == num_points)
+        placed = np.flatnonzero(success & (moves != num_points))
+
+        captured, ko = self.board.place(placed, moves[placed], self.current_player[placed])
+        for color in (BLACK, WHITE):
+            self.captured_stones[color] += np.where(self.current_player == color, captured, 0)
+
+        self.ko[success] = ko[success]
+        self.passes[is_pass] += 1
+        self.passes[placed] = 0
+        self.move_count[success] += 1
+        self.current_player[success] *= -1
+        self.game_over |= (self.passes >= 2) | (self.move_count >= self.max_moves)
+        self._legal_mask = None
+
+        return success
+
+    def random_moves(self, rng=None, avoid_eyes=True):
+        """
+        各局の合法手（パス以外を優先）から一様に1手ずつ選ぶ
+
+        Args:
+            rng: np.random.Generator（Noneなら新規作成）
+            avoid_eyes: 自分の眼を埋める手を除くか
+
+        Returns:
+            (N,) の着手の平坦インデックス
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        mask = self.legal_mask().copy()
+        if avoid_eyes:
+            mask[:, :-1] &= ~self.board.eye_mask(self.current_player).reshape(len(self), -1)
+        has_move = mask[:, :-1].any(axis=1)
+        mask[has_move, -1] = False
+        keys = np.where(mask, rng.random(mask.shape), -1.0)
+        return np.argmax(keys, axis=1)
+
+    def scores(self):
+        """各局のエリア方式の得点差（黒 - 白 - コミ）"""
+        return self.board.area_scores(self.komi)
+
+    def winners(self):
+        """各局の勝者 (1: 黒, -1: 白, 0: 引き分け)"""
+        return np.sign(self.scores()).astype(np.int8)
@@ -0,0 +1,234 @@
+# go_engine/bitboard.py
+"""
+ビットボード版の盤面
+
+黒・白の石をそれぞれ1つのPython整数のビット集合として持ち、連の探索・
+呼吸点の数え上げ・取り上げ判定をシフトとマスクで行う。
+9路（81bit）や13路（169bit）では整数演算数回で盤面全体を処理できる。
+
+公開APIは go_engine.board.Board と同じで、GAME_CONFIG["board_backend"]
+で切り替える。
+"""
+import numpy as np
+
+from .board import Board, EMPTY, BLACK, WHITE
+
+# 盤面サイズごとのビット配置のキャッシュ
+_BIT_LAYOUTS = {}
+
+
+def bit_layout(size):
+    """
+    ビット配置の情報を取得
+
+    各行の右端に1bitの空き（番兵列）を置いた幅 size+1 の配置を使うため、
+    左右のシフトで隣の行に回り込まない。
+
+    Args:
+        size: 盤面サイズ
+
+    Returns:
+        {"width": 行の幅, "bits": 平坦インデックス -> ビット,
+         "points": ビット位置 -> 平坦インデックス, "on_board": 盤内マスク}
+    """
+    layout = _BIT_LAYOUTS.get(size)
+    if layout is None:
+        width = size + 1
+        bits = []
+        points = {}
+        on_board = 0
+        for x in range(size):
+            for y in range(size):
+                index = x * width + y
+                bits.append(1 << index)
+                points[index] = x * size + y
+                on_board |= 1 << index
+        layout = {"width": width, "bits": bits, "points": points, "on_board": on_board}
+        _BIT_LAYOUTS[size] = layout
+    return layout
+
+
+class BitBoard(Board):
+    """ビットボード版の盤面（Boardと同じAPI）"""
+
+    def __init__(self, size=9):
+        layout = bit_layout(size)
+        self._width = layout["width"]
+        self._bits = layout["bits"]
+        self._bit_points = layout["points"]
+        self._on_board = layout["on_board"]
+        super().__init__(size)
+
+    def _set_grid(self, grid):
+        """盤面配列を設定し、ビット集合とハッシュを作り直す"""
+        self._grid = grid
+        self._flat = grid.reshape(-1)
+        self.cells = [int(c) for c in self._flat]
+        self._stones = {BLACK: 0, WHITE: 0}
+        self._hash = 0
+        for p, c in enumerate(self.cells):
+            if c != EMPTY:
+                self._stones[c] |= self._bits[p]
+                self._hash ^= self._zobrist_stones[c][p]
+
+    def clone(self):
+        """盤面の複製を返す"""
+        board = BitBoard.__new__(BitBoard)
+        board.size = self.size
+        board.ko = self.ko
+        board.adjacent = self.adjacent
+        board._zobrist_stones = self._zobrist_stones
+        board._width = self._width
+        board._bits = self._bits
+        board._bit_points = self._bit_points
+        board._on_board = self._on_board
+        board._grid = self._grid.copy()
+        board._flat = board._grid.reshape(-1)
+        board.cells = self.cells[:]
+        board._stones = self._stones.copy()
+        board._hash = self._hash
+        return board
+
+    # ===== ビット演算 =====
+    def _expand(self, bits):
+        """ビット集合を上下左右に1マス広げる（盤内に限る）"""
+        w = self._width
+        return (bits | (bits << 1) | (bits >> 1) | (bits << w) | (bits >> w)) & self._on_board
+
+    def _flood(self, seed, region):
+        """seedからregion内で繋がっている点のビット集合"""
+        group = seed
+        while True:
+            grown = self._expand(group) & region
+            if grown == group:
+                return group
+            group = grown
+
+    def _empty(self):
+        """空点のビット集合"""
+        return self._on_board & ~(self._stones[BLACK] | self._stones[WHITE])
+
+    def _group(self, p):
+        """点pの石が属する連のビット集合"""
+        return self._flood(self._bits[p], self._stones[self.cells[p]])
+
+    def _liberty_bits(self, group):
+        """連の呼吸点のビット集合"""
+        return self._expand(group) & self._empty()
+
+    def _bits_to_points(self, bits):
+        """ビット集合を平坦インデックスのリストに変換"""
+        points = []
+        bit_points = self._bit_points
+        while bits:
+            low = bits & -bits
+            points.append(bit_points[low.bit_length() - 1])
+            bits ^= low
+        return points
+
+    # ===== 平坦インデックスベースのAPI =====
+    def string_size(self, p):
+        """点pの石が属する連の石数（空点なら0）"""
+        if self.cells[p] == EMPTY:
+            return 0
+        return self._group(p).bit_count()
+
+    def liberty_count(self, p):
+        """点pの石が属する連の呼吸点数（空点なら0）"""
+        if self.cells[p] == EMPTY:
+            return 0
+        return self._liberty_bits(self._group(p)).bit_count()
+
+    def string_head(self, p):
+        """点pの石が属する連の代表点（連の最下位ビット、空点なら-1）"""
+        if self.cells[p] == EMPTY:
+            return -1
+        group = self._group(p)
+        return self._bit_points[(group & -group).bit_length() - 1]
+
+    def string_points(self, p):
+        """点pの石が属する連の石を列挙"""
+        return self._bits_to_points(self._group(p))
+
+    def string_liberties(self, p):
+        """点pの石が属する連の呼吸点の集合"""
+        if self.cells[p] == EMPTY:
+            return set()
+        return set(self._bits_to_points(self._liberty_bits(self._group(p))))
+
+    def liberty_map(self):
+        """各点の石が属する連の呼吸点数を並べた配列（空点は0）"""
+        liberties = [0] * (self.size * self.size)
+        for color in (BLACK, WHITE):
+            rest = self._stones[color]
+            while rest:
+                group = self._flood(rest & -rest, self._stones[color])
+                count = self._liberty_bits(group).bit_count()
+                for q in self._bits_to_points(group):
+                    liberties[q] = count
+                rest &= ~group
+        return np.array(liberties, dtype=np.int32).reshape(self.size, self.size)
+
+    def stone_bits(self, color):
+        """指定した色の石のビット集合（go_engine.scoring で使う）"""
+        return self._stones[color]
+
+    def place(self, p, color):
+        """点pに石を置く（取り上げは行わない）"""
+        self.cells[p] = color
+        self._flat[p] = color
+        self._hash ^= self._zobrist_stones[color][p]
+        self._stones[color] |= self._bits[p]
+
+    def remove(self, p):
+        """点pの石を1つ取り除く"""
+        color = self.cells[p]
+        if color == EMPTY:
+            return
+        self.cells[p] = EMPTY
+        self._flat[p] = EMPTY
+        self._hash ^= self._zobrist_stones[color][p]
+        self._stones[color] &= ~self._bits[p]
+
+    def remove_string(self, p):
+        """点pの石が属する連をまとめて取り除き、取り除いた点のリストを返す"""
+        color = self.cells[p]
+        group = self._group(p)
+        self._stones[color] &= ~group
+        points = self._bits_to_points(group)
+        stones = self._zobrist_stones[color]
+        for q in points:
+            self.cells[q] = EMPTY
+            self._flat[q] = EMPTY
+            self._hash ^= stones[q]
+        return points
+
+    def place_string(self, points, color):
+        """取り上げた連をまとめて盤面に戻す（undo用）"""
+        for q in points:
+            self.place(q, color)
+
+
+def create_board(size=9, backend=None):
+    """
+    盤面を作成
+
+    Args:
+        size: 盤面サイズ
+        backend: "numpy" または "bitboard"（Noneなら GAME_CONFIG["board_backend"]）
+
+    Returns:
+        Board または BitBoard
+    """
+    if backend is None:
+        try:
+            from config import GAME_CONFIG
+            backend = GAME_CONFIG.get("board_backend", "numpy")
+        except ImportError:
+            backend = "numpy"
+
+    if backend == "bitboard":
+        return BitBoard(size)
+    if backend == "numpy":
+        return Board(size)
+    raise ValueError(f"Unknown board backend: {backend}")
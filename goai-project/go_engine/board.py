@@ -6,39 +6,502 @@ EMPTY = 0
 BLACK = 1
 WHITE = -1
 
+# 番兵付き1次元盤面で盤外を表す値
+BORDER = 2
+
+# 盤面サイズごとの座標テーブルのキャッシュ
+_PADDED_TABLES = {}
+_ADJACENT_TABLES = {}
+
+# 盤面サイズごとのZobristハッシュ用乱数テーブルのキャッシュ
+_ZOBRIST_TABLES = {}
+ZOBRIST_SEED = 20240601
+
+
+def padded_tables(size):
+    """
+    番兵付き1次元盤面のインデックステーブルを取得
+
+    番兵付き盤面は幅 size+2 の正方形を1次元に並べたもので、外周の1列を
+    BORDER で埋める。隣接点は整数オフセットを足すだけで求まり、範囲
+    チェックが不要になる。
+
+    Args:
+        size: 盤面サイズ
+
+    Returns:
+        {
+            "width": 番兵付き盤面の幅,
+            "points": 平坦インデックス -> 番兵付きインデックス (N,),
+            "flat": 番兵付きインデックス -> 平坦インデックス（盤外は-1）,
+            "neighbor_offsets": 上下左右のオフセット,
+            "diagonal_offsets": 斜めのオフセット,
+            "neighbors": 各点の隣接点の番兵付きインデックス (N, 4),
+            "diagonals": 各点の斜め隣接点の番兵付きインデックス (N, 4),
+        }
+    """
+    tables = _PADDED_TABLES.get(size)
+    if tables is None:
+        width = size + 2
+        xs, ys = np.divmod(np.arange(size * size), size)
+        points = ((xs + 1) * width + (ys + 1)).astype(np.int32)
+        flat = np.full(width * width, -1, dtype=np.int32)
+        flat[points] = np.arange(size * size, dtype=np.int32)
+        neighbor_offsets = (width, -width, 1, -1)
+        diagonal_offsets = (width + 1, width - 1, -width + 1, -width - 1)
+        tables = {
+            "width": width,
+            "points": points,
+            "flat": flat,
+            "neighbor_offsets": neighbor_offsets,
+            "diagonal_offsets": diagonal_offsets,
+            "neighbors": points[:, None] + np.array(neighbor_offsets, dtype=np.int32),
+            "diagonals": points[:, None] + np.array(diagonal_offsets, dtype=np.int32),
+        }
+        _PADDED_TABLES[size] = tables
+    return tables
+
+
+def _flat_table(padded_neighbors, flat):
+    """番兵付きインデックスの表を盤内の平坦インデックスのタプルのリストに変換"""
+    table = []
+    for row in flat[padded_neighbors].tolist():
+        table.append(tuple(p for p in row if p >= 0))
+    return table
+
+
+def adjacent_table(size):
+    """
+    平坦インデックス（x * size + y）での隣接点テーブルを取得
+
+    Args:
+        size: 盤面サイズ
+
+    Returns:
+        各点の隣接点インデックスのタプルを並べたリスト
+    """
+    table = _ADJACENT_TABLES.get(size)
+    if table is None:
+        tables = padded_tables(size)
+        table = _flat_table(tables["neighbors"], tables["flat"])
+        _ADJACENT_TABLES[size] = table
+    return table
+
+
+def zobrist_table(size):
+    """
+    Zobristハッシュ用の64bit乱数テーブルを取得
+
+    プロセス間でハッシュ値が一致するように、盤面サイズごとに固定シードで生成する。
+
+    Args:
+        size: 盤面サイズ
+
+    Returns:
+        {"stones": {BLACK: [...], WHITE: [...]}, "stones_array": {...},
+         "ko": [...], "side": int}
+    """
+    table = _ZOBRIST_TABLES.get(size)
+    if table is None:
+        num_points = size * size
+        rng = np.random.default_rng(ZOBRIST_SEED + size)
+        keys = rng.integers(0, 2**64, size=3 * num_points + 1, dtype=np.uint64).tolist()
+        table = {
+            "stones": {
+                BLACK: keys[:num_points],
+                WHITE: keys[num_points:2 * num_points],
+            },
+            # ベクトル演算用に同じ値をnumpy配列でも保持
+            "stones_array": {
+                BLACK: np.array(keys[:num_points], dtype=np.uint64),
+                WHITE: np.array(keys[num_points:2 * num_points], dtype=np.uint64),
+            },
+            "ko": keys[2 * num_points:3 * num_points],
+            "side": keys[3 * num_points],
+        }
+        _ZOBRIST_TABLES[size] = table
+    return table
+
+
 class Board:
+    """
+    囲碁の盤面
+
+    石の配置（numpy配列）に加えて、連（同色で繋がった石の集合）を
+    石の配置・除去のたびに差分更新で管理する。連は循環リストで表現し、
+    連ごとの呼吸点数を保持するため、連・呼吸点・アタリの問い合わせは
+    O(1) または O(連のサイズ) で済む。
+
+    石の配置のZobristハッシュも同様に差分更新する（zobrist_hash）。
+    """
+
     def __init__(self, size=9):
         self.size = size
-        self.board = np.zeros((size, size), dtype=np.int8)
         self.ko = None
-        
+        self.adjacent = adjacent_table(size)
+        self._zobrist_stones = zobrist_table(size)["stones"]
+        self._set_grid(np.zeros((size, size), dtype=np.int8))
+
+    @property
+    def board(self):
+        """石の配置（size x size の np.int8 配列）"""
+        return self._grid
+
+    @board.setter
+    def board(self, grid):
+        # 配列ごと差し替えられた場合は連の情報を作り直す
+        self._set_grid(np.array(grid, dtype=np.int8))
+
+    def _set_grid(self, grid):
+        """盤面配列を設定し、連の情報を全て再構築"""
+        num_points = self.size * self.size
+        self._grid = grid
+        self._flat = grid.reshape(-1)
+        self.cells = [int(c) for c in self._flat]
+        self._head = [-1] * num_points       # 各石が属する連の代表点
+        self._next = list(range(num_points))  # 連内の次の石（循環リスト）
+        self._string_size = [0] * num_points  # 代表点ごとの石数
+        self._liberties = [0] * num_points    # 代表点ごとの呼吸点数
+        self._hash = 0
+
+        for p in range(num_points):
+            if self.cells[p] != EMPTY:
+                self._hash ^= self._zobrist_stones[self.cells[p]][p]
+                if self._head[p] == -1:
+                    self._rebuild_strings([p])
+
+    def clone(self):
+        """
+        盤面の複製を返す
+
+        deepcopyと違い、盤面サイズごとに共有できるテーブルは共有し、
+        盤面の配列と連の情報の配列だけをコピーする。
+        """
+        board = Board.__new__(Board)
+        board.size = self.size
+        board.ko = self.ko
+        board.adjacent = self.adjacent
+        board._zobrist_stones = self._zobrist_stones
+        board._grid = self._grid.copy()
+        board._flat = board._grid.reshape(-1)
+        board.cells = self.cells[:]
+        board._head = self._head[:]
+        board._next = self._next[:]
+        board._string_size = self._string_size[:]
+        board._liberties = self._liberties[:]
+        board._hash = self._hash
+        return board
+
+    def __deepcopy__(self, memo):
+        # _flat は _grid のビューなので、別々にコピーさせずに clone() で作り直す
+        board = self.clone()
+        memo[id(self)] = board
+        return board
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_flat"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._flat = self._grid.reshape(-1)
+
+    @property
+    def zobrist_hash(self):
+        """石の配置の64bit Zobristハッシュ（辞書のキーとして使える）"""
+        return self._hash
+
+    def liberty_map(self):
+        """
+        各点の石が属する連の呼吸点数を並べた配列（空点は0）
+
+        Returns:
+            size x size の np.int32 配列
+        """
+        liberties = np.array(self._liberties, dtype=np.int32)[np.array(self._head)]
+        liberties[self._flat == EMPTY] = 0
+        return liberties.reshape(self.size, self.size)
+
+    # ===== 座標変換 =====
+    def point(self, x, y):
+        """座標を平坦インデックスに変換"""
+        return x * self.size + y
+
+    def xy(self, p):
+        """平坦インデックスを座標に変換"""
+        return divmod(p, self.size)
+
+    # ===== 座標ベースのAPI =====
     def is_on_board(self, x, y):
         """盤面内かどうかチェック"""
         return 0 <= x < self.size and 0 <= y < self.size
-    
+
     def get_adjacent_points(self, x, y):
         """隣接する点を取得"""
-        adjacent = []
-        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-            nx, ny = x + dx, y + dy
-            if self.is_on_board(nx, ny):
-                adjacent.append((nx, ny))
-        return
-    
+        return [divmod(n, self.size) for n in self.adjacent[x * self.size + y]]
+
     def get_color(self, x, y):
         """指定位置の石の色を取得"""
         if not self.is_on_board(x, y):
             return None
-        return self.board[x, y]
-    
+        return self.cells[x * self.size + y]
+
     def place_stone(self, x, y, color):
         """石を置く（合法手チェックなし）"""
-        self.board[x, y] = color
-        
+        self.place(x * self.size + y, color)
+
     def remove_stone(self, x, y):
         """石を取り除く"""
-        self.board[x, y] = EMPTY
-        
+        self.remove(x * self.size + y)
+
+    def get_group(self, x, y):
+        """指定位置の石が属する連の座標リストを取得"""
+        p = x * self.size + y
+        if self.cells[p] == EMPTY:
+            return []
+        return [divmod(q, self.size) for q in self.string_points(p)]
+
+    def get_group_size(self, x, y):
+        """指定位置の石が属する連の石数を取得"""
+        return self.string_size(x * self.size + y)
+
+    def get_liberties(self, x, y):
+        """指定位置の石が属する連の呼吸点の座標リストを取得"""
+        return [divmod(q, self.size) for q in self.string_liberties(x * self.size + y)]
+
+    def count_liberties(self, x, y):
+        """指定位置の石が属する連の呼吸点数を取得"""
+        return self.liberty_count(x * self.size + y)
+
+    def is_in_atari(self, x, y):
+        """指定位置の石がアタリかどうか"""
+        return self.liberty_count(x * self.size + y) == 1
+
+    # ===== 平坦インデックスベースのAPI（探索・ルール判定用） =====
+    def string_size(self, p):
+        """点pの石が属する連の石数（空点なら0）"""
+        if self.cells[p] == EMPTY:
+            return 0
+        return self._string_size[self._head[p]]
+
+    def liberty_count(self, p):
+        """点pの石が属する連の呼吸点数（空点なら0）"""
+        if self.cells[p] == EMPTY:
+            return 0
+        return self._liberties[self._head[p]]
+
+    def string_head(self, p):
+        """点pの石が属する連の代表点（空点なら-1）"""
+        return self._head[p]
+
+    def string_points(self, p):
+        """点pの石が属する連の石を列挙"""
+        points = [p]
+        q = self._next[p]
+        while q != p:
+            points.append(q)
+            q = self._next[q]
+        return points
+
+    def string_liberties(self, p):
+        """点pの石が属する連の呼吸点の集合"""
+        if self.cells[p] == EMPTY:
+            return set()
+        cells = self.cells
+        adjacent = self.adjacent
+        liberties = set()
+        for q in self.string_points(p):
+            for n in adjacent[q]:
+                if cells[n] == EMPTY:
+                    liberties.add(n)
+        return liberties
+
+    def place(self, p, color):
+        """
+        点pに石を置き、連と呼吸点数を差分更新（取り上げは行わない）
+
+        Args:
+            p: 平坦インデックス
+            color: 石の色
+        """
+        cells = self.cells
+        head = self._head
+        liberties = self._liberties
+
+        cells[p] = color
+        self._flat[p] = color
+        self._hash ^= self._zobrist_stones[color][p]
+        head[p] = p
+        self._next[p] = p
+        self._string_size[p] = 1
+
+        own_liberties = 0
+        seen = []
+        friends = []
+        for n in self.adjacent[p]:
+            c = cells[n]
+            if c == EMPTY:
+                own_liberties += 1
+                continue
+            h = head[n]
+            if h in seen:
+                continue
+            seen.append(h)
+            # pは隣接する連の呼吸点だった
+            liberties[h] -= 1
+            if c == color:
+                friends.append(h)
+        liberties[p] = own_liberties
+
+        if friends:
+            h = p
+            for friend in friends:
+                h = self._merge(h, friend)
+            liberties[h] = len(self.string_liberties(h))
+
+    def remove(self, p):
+        """
+        点pの石を1つ取り除き、連と呼吸点数を差分更新
+
+        Args:
+            p: 平坦インデックス
+        """
+        if self.cells[p] == EMPTY:
+            return
+        h = self._head[p]
+        if self._string_size[h] == 1:
+            self._clear_point(p)
+            self._add_liberty_to_neighbors(p)
+            return
+
+        # 連が分断される可能性があるので残りの石で作り直す
+        color = self.cells[p]
+        rest = [q for q in self.string_points(p) if q != p]
+        self._clear_point(p)
+        for q in rest:
+            self._head[q] = -1
+        self._rebuild_strings(rest)
+        self._add_liberty_to_neighbors(p, skip_color=color)
+
+    def remove_string(self, p):
+        """
+        点pの石が属する連をまとめて取り除く（取り上げ用）
+
+        Args:
+            p: 平坦インデックス
+
+        Returns:
+            取り除いた点のリスト
+        """
+        points = self.string_points(p)
+        for q in points:
+            self._clear_point(q)
+        for q in points:
+            self._add_liberty_to_neighbors(q)
+        return points
+
+    def place_string(self, points, color):
+        """
+        取り上げた連をまとめて盤面に戻す（undo用）
+
+        pointsは取り上げ時点で1つ以上の独立した連だったことを前提とし、
+        他の同色の連とは接しない。
+
+        Args:
+            points: 平坦インデックスのリスト
+            color: 石の色
+        """
+        cells = self.cells
+        stones = self._zobrist_stones[color]
+        for q in points:
+            cells[q] = color
+            self._flat[q] = color
+            self._hash ^= stones[q]
+            self._head[q] = -1
+        self._rebuild_strings(points)
+
+        # 戻した石の位置は隣接する相手の連の呼吸点ではなくなる
+        head = self._head
+        liberties = self._liberties
+        for q in points:
+            seen = []
+            for n in self.adjacent[q]:
+                if cells[n] == -color:
+                    h = head[n]
+                    if h not in seen:
+                        seen.append(h)
+                        liberties[h] -= 1
+
+    def _clear_point(self, p):
+        """点pを空点にする（連情報の後始末は呼び出し側で行う）"""
+        self._hash ^= self._zobrist_stones[self.cells[p]][p]
+        self.cells[p] = EMPTY
+        self._flat[p] = EMPTY
+        self._head[p] = -1
+        self._next[p] = p
+
+    def _add_liberty_to_neighbors(self, p, skip_color=None):
+        """空点になったpを隣接する各連の呼吸点として加算"""
+        head = self._head
+        seen = []
+        for n in self.adjacent[p]:
+            c = self.cells[n]
+            if c == EMPTY or c == skip_color:
+                continue
+            h = head[n]
+            if h not in seen:
+                seen.append(h)
+                self._liberties[h] += 1
+
+    def _merge(self, a, b):
+        """代表点a, bの連を併合し、新しい代表点を返す"""
+        if a == b:
+            return a
+        size = self._string_size
+        if size[a] < size[b]:
+            a, b = b, a
+        head = self._head
+        q = b
+        while True:
+            head[q] = a
+            q = self._next[q]
+            if q == b:
+                break
+        # 循環リストの連結
+        nxt = self._next
+        nxt[a], nxt[b] = nxt[b], nxt[a]
+        size[a] += size[b]
+        return a
+
+    def _rebuild_strings(self, points):
+        """代表点未設定の石pointsから連を探索し直して登録"""
+        cells = self.cells
+        head = self._head
+        adjacent = self.adjacent
+        for start in points:
+            if head[start] != -1:
+                continue
+            color = cells[start]
+            members = []
+            liberties = set()
+            head[start] = start
+            stack = [start]
+            while stack:
+                q = stack.pop()
+                members.append(q)
+                for n in adjacent[q]:
+                    c = cells[n]
+                    if c == EMPTY:
+                        liberties.add(n)
+                    elif c == color and head[n] == -1:
+                        head[n] = start
+                        stack.append(n)
+            for i, q in enumerate(members):
+                self._next[q] = members[(i + 1) % len(members)]
+            self._string_size[start] = len(members)
+            self._liberties[start] = len(liberties)
+
     def display(self):
         """盤面を表示"""
         for i in range(self.size):
@@ -51,4 +514,4 @@ class Board:
                 else:
                     row.append('.')
             print(''.join(row))
-        print()
\ No newline at end of file
+        print()
@@ -1,62 +1,246 @@
 # go_engine/game.py
-from .board import Board, BLACK, WHITE, EMPTY
+from collections import namedtuple
+
+import numpy as np
+
+from .board import BLACK, WHITE, zobrist_table
+from . import rules
+from .bitboard import create_board
+from .history import SharedHistory
+
+# play() が返す、手を取り消すための情報
+UndoToken = namedtuple(
+    "UndoToken",
+    ["move", "color", "ko", "passes", "game_over", "captured", "new_position"],
+)
 
 class Game:
-    def __init__(self, board_size=9):
-        self.board = Board(board_size)
+    def __init__(self, board_size=9, superko=True, backend=None):
+        # backend: 盤面の実装（"numpy" / "bitboard"、Noneなら GAME_CONFIG に従う）
+        self.board = create_board(board_size, backend)
         self.current_player = BLACK
         self.passes = 0
         self.game_over = False
-        self.move_history = []
-        self.board_history = []
+        self.move_history = SharedHistory()
+        self.board_history = SharedHistory()
         self.captured_stones = {1: 0, -1: 0}
-        
+
+        # ポジショナル超コウ判定用の局面履歴
+        self.superko = superko
+        self.position_history = SharedHistory([rules.position_key(self.board)], indexed=True)
+
+        # 合法手マスクのキャッシュ
+        self._legal_mask = None
+        self._legal_mask_key = None
+
+    def clone(self):
+        """
+        ゲームの複製を返す
+
+        盤面の配列とスカラー値だけをコピーし、履歴はコピーオンライトで
+        共有するため、手数に関係なく一定のコストで複製できる。
+        """
+        game = Game.__new__(Game)
+        game.board = self.board.clone()
+        game.current_player = self.current_player
+        game.passes = self.passes
+        game.game_over = self.game_over
+        game.move_history = _shared(self.move_history)
+        game.board_history = _shared(self.board_history)
+        game.captured_stones = self.captured_stones.copy()
+        game.superko = self.superko
+        game.position_history = _shared(self.position_history, indexed=True)
+        game._legal_mask = self._legal_mask
+        game._legal_mask_key = self._legal_mask_key
+        return game
+
+    @property
+    def position_hash(self):
+        """
+        局面の64bit Zobristハッシュ
+
+        石の配置に手番とコウの点を加味したもので、置換表や評価キャッシュの
+        辞書のキーとして使える。
+        """
+        keys = zobrist_table(self.board.size)
+        h = self.board.zobrist_hash
+        if self.current_player == WHITE:
+            h ^= keys["side"]
+        if self.board.ko is not None:
+            h ^= keys["ko"][self.board.ko]
+        return h
+
+    def legal_mask(self):
+        """
+        合法手マスクを取得
+
+        局面ごとにキャッシュし、手が進む（局面が変わる）と再計算する。
+        返す配列は読み取り専用で、変更する場合は copy() すること。
+
+        Returns:
+            長さ size*size+1 のbool配列（インデックス x*size+y、最後の要素はパス）
+        """
+        key = (self.position_hash, len(self.position_history))
+        if self._legal_mask_key != key:
+            # 取り上げが一度もなければ石数が単調増加するので同一局面は現れない
+            history = None
+            if self.superko and (self.captured_stones[BLACK] or self.captured_stones[WHITE]):
+                history = self.position_history
+            mask = rules.legal_mask(self.board, self.current_player, history)
+            mask.flags.writeable = False
+            self._legal_mask = mask
+            self._legal_mask_key = key
+        return self._legal_mask
+
     def get_legal_moves(self):
         """合法手のリストを取得"""
-        legal_moves = []
-        for x in range(self.board.size):
-            for y in range(self.board.size):
-                if self.is_legal_move(x, y):
-                    legal_moves.append((x, y))
+        size = self.board.size
+        points = np.flatnonzero(self.legal_mask()[:-1]).tolist()
+        legal_moves = [divmod(p, size) for p in points]
         # パスは常に合法
         legal_moves.append(None)
         return legal_moves
-        
+
     def is_legal_move(self, x, y):
         """指定された手が合法かどうかチェック"""
         # パスの場合は常に合法
         if x is None and y is None:
             return True
-        
-        # 盤面の範囲外またはすでに石がある場合は不正
-        if not self.board.is_on_board(x, y) or self.board.get_color(x, y) != EMPTY:
+
+        # 盤面の範囲外は不正
+        if not self.board.is_on_board(x, y):
             return False
-        
-        # 簡略版：空いているマスには打てる
-        return True
-    
+
+        # 取り上げ・自殺手・コウの判定は連の情報を使って着手点の周囲だけで行う
+        history = self.position_history if self.superko else None
+        return rules.is_legal(self.board, self.board.point(x, y), self.current_player, history)
+
     def make_move(self, move):
         """手を実行"""
+        return self.play(move) is not None
+
+    def play(self, move, check_legal=True):
+        """
+        手を実行し、元に戻すためのトークンを返す
+
+        Args:
+            move: 着手（(x, y) または パスの場合 None）
+            check_legal: 合法性をチェックするか（探索で合法手が分かっている場合は省略可）
+
+        Returns:
+            undo() に渡すトークン（不正な手の場合は None）
+        """
+        color = self.current_player
+        token_base = (move, color, self.board.ko, self.passes, self.game_over)
+        self._invalidate_legal_mask()
+
         if move is None:  # パス
             self.passes += 1
-            self.current_player = -self.current_player
+            self.board.ko = None
+            self.current_player = -color
             self.move_history.append(None)
-            
+
             # 連続２回のパスでゲーム終了
             if self.passes >= 2:
                 self.game_over =True
-                
-            return True
-            
+
+            return UndoToken(*token_base, captured=(), new_position=False)
+
         x, y = move
-        if not self.is_legal_move(x, y):
-            return False
-            
+        if check_legal and not self.is_legal_move(x, y):
+            return None
+
         self.passes = 0
-        self.board.place_stone(x, y, self.current_player)
-        # 石を取る処理など
-        
-        self.current_player = -self.current_player
+        captured = rules.play(self.board, self.board.point(x, y), color)
+        self.captured_stones[color] += len(captured)
+        new_position = False
+        if self.superko:
+            key = rules.position_key(self.board)
+            if key not in self.position_history:
+                self.position_history.append(key)
+                new_position = True
+
+        self.current_player = -color
         self.move_history.append((x, y))
-            
-        return True
\ No newline at end of file
+
+        return UndoToken(*token_base, captured=captured, new_position=new_position)
+
+    def undo(self, token):
+        """
+        play() で実行した手を取り消し、直前の状態に正確に戻す
+
+        手は実行した順と逆の順で取り消すこと。
+
+        Args:
+            token: play() が返したトークン
+        """
+        self._invalidate_legal_mask()
+        color = token.color
+        if token.move is not None:
+            if token.new_position:
+                self.position_history.pop()
+            board = self.board
+            board.remove(board.point(*token.move))
+            if token.captured:
+                board.place_string(token.captured, -color)
+            self.captured_stones[color] -= len(token.captured)
+
+        self.board.ko = token.ko
+        self.passes = token.passes
+        self.game_over = token.game_over
+        self.current_player = color
+        self.move_history.pop()
+
+    def _invalidate_legal_mask(self):
+        """
+        合法手マスクのキャッシュを捨てる
+
+        同じ局面・同じ手数でも手順が違えば超コウの局面履歴が異なるので、
+        キャッシュのキーだけでは区別できない。手を打つ・戻すたびに捨てる。
+        """
+        self._legal_mask = None
+        self._legal_mask_key = None
+
+
+def _shared(history, indexed=False):
+    """履歴の共有複製を返す（外部から普通のlistを代入された場合も扱う）"""
+    if not isinstance(history, SharedHistory):
+        history = SharedHistory(history, indexed=indexed)
+    return history.clone()
+
+
+def benchmark_clone(board_size=19, num_moves=150, repeat=200):
+    """
+    clone() と copy.deepcopy の速度を比較
+
+    Args:
+        board_size: 盤面サイズ
+        num_moves: 比較に使う局面までのランダムな手数
+        repeat: 計測の繰り返し回数
+
+    Returns:
+        速度比（deepcopyの時間 / cloneの時間）
+    """
+    import copy
+    import random
+    import timeit
+
+    rng = random.Random(0)
+    game = Game(board_size)
+    for _ in range(num_moves):
+        moves = [move for move in game.get_legal_moves() if move is not None]
+        game.make_move(rng.choice(moves) if moves else None)
+
+    deepcopy_time = timeit.timeit(lambda: copy.deepcopy(game), number=repeat) / repeat
+    clone_time = timeit.timeit(game.clone, number=repeat) / repeat
+    speedup = deepcopy_time / clone_time
+
+    print(f"{board_size}x{board_size} {len(game.move_history)}手目の局面")
+    print(f"deepcopy: {deepcopy_time * 1e6:.1f} µs")
+    print(f"clone:    {clone_time * 1e6:.1f} µs")
+    print(f"速度比:   {speedup:.1f}x")
+    return speedup
+
+
+if __name__ == "__main__":
+    benchmark_clone()
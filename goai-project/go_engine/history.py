@@ -0,0 +1,108 @@
+# go_engine/history.py
+"""
+Game.clone() で共有される履歴
+
+複製したゲーム同士で同じリストを共有し、どちらかが途中から別の手を
+追加した時点で初めてリストを複製する（コピーオンライト）。そのため
+複製のコストは履歴の長さに依存しない。
+"""
+from itertools import islice
+
+
+class _HistoryStore:
+    """複数の SharedHistory から共有される実体"""
+
+    __slots__ = ("items", "index", "shared")
+
+    def __init__(self, items, indexed):
+        self.items = items
+        # 要素 -> 位置 の索引（局面履歴の O(1) 包含判定用）
+        self.index = {item: i for i, item in enumerate(items)} if indexed else None
+        self.shared = False
+
+
+class SharedHistory:
+    """
+    追記専用の共有履歴
+
+    listと同様に len()・添字・スライス・反復ができ、変更は append() と
+    pop()（末尾の取り消し）のみ。indexed=True の場合は要素の包含判定が
+    O(1) になる（要素は重複しない前提）。
+    """
+
+    __slots__ = ("_store", "_length")
+
+    def __init__(self, items=(), indexed=False):
+        items = list(items)
+        self._store = _HistoryStore(items, indexed)
+        self._length = len(items)
+
+    def clone(self):
+        """履歴を共有した複製を返す（O(1)）"""
+        self._store.shared = True
+        history = SharedHistory.__new__(SharedHistory)
+        history._store = self._store
+        history._length = self._length
+        return history
+
+    def append(self, item):
+        """末尾に要素を追加"""
+        store = self._store
+        if self._length < len(store.items):
+            if store.shared:
+                # 他の履歴と分岐するのでここで初めて複製する
+                self._store = store = _HistoryStore(
+                    store.items[:self._length], store.index is not None)
+            else:
+                self._truncate()
+        store.items.append(item)
+        if store.index is not None:
+            store.index.setdefault(item, self._length)
+        self._length += 1
+
+    def pop(self):
+        """末尾の要素を取り除いて返す"""
+        if self._length == 0:
+            raise IndexError("pop from empty history")
+        self._length -= 1
+        item = self._store.items[self._length]
+        if not self._store.shared:
+            self._truncate()
+        return item
+
+    def _truncate(self):
+        """共有されていない実体から自分の長さ以降の要素を削除"""
+        store = self._store
+        if store.index is not None:
+            for i in range(self._length, len(store.items)):
+                if store.index.get(store.items[i]) == i:
+                    del store.index[store.items[i]]
+        del store.items[self._length:]
+
+    def __contains__(self, item):
+        index = self._store.index
+        if index is not None:
+            i = index.get(item)
+            return i is not None and i < self._length
+        return item in islice(self._store.items, self._length)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return islice(self._store.items, self._length)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._store.items[:self._length][i]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("history index out of range")
+        return self._store.items[i]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"SharedHistory({list(self)!r})"
@@ -0,0 +1,587 @@
+# go_engine/playout.py
+"""
+ロールアウト（プレイアウト）専用の軽量な対局エンジン
+
+MCTSのロールアウトでは合法手リストの作成や Game の履歴管理は不要なので、
+番兵付き1次元盤面の整数リストだけで終局まで打ち切る。
+
+- 空点は配列と位置の索引で持ち、石の配置・除去のたびに O(1) で更新する
+- 連は循環リストと擬似呼吸点数（各石の空き隣接点の延べ数）で管理する
+- 着手は空点から一様に選び、自殺手・コウ・自分の眼は打たない
+- 超コウは判定しない（単純なコウのみ）
+
+HeavyPlayout は直前の手の周囲8点を 3x3 パターン表の重みで選ぶ重い
+プレイアウトで、該当する手がなければ一様な選択に戻る。
+"""
+import random
+import threading
+
+import numpy as np
+
+from .board import EMPTY, BLACK, WHITE, BORDER, padded_tables
+
+# 盤面サイズごとのエンジンのキャッシュ
+_PLAYOUTS = {}
+
+# HeavyPlayout は対局中の状態を持つのでスレッドごとにキャッシュする
+_HEAVY_PLAYOUTS = threading.local()
+
+# 3x3パターンでの周囲8点の状態（手番側から見た値）
+PATTERN_EMPTY = 0
+PATTERN_OWN = 1
+PATTERN_OPPONENT = 2
+PATTERN_EDGE = 3
+
+# パターンの重み（手番側から見た値、0ならパターンでは選ばない）
+PATTERN_WEIGHTS = {
+    "capture": 40,  # アタリの相手の連を取る
+    "save": 20,     # アタリの自分の連を伸ばす
+    "cut": 10,      # 斜めにつながっていない相手の石を切る
+    "contact": 4,   # 相手の石に接触し、自分の石もそばにある
+}
+
+_PATTERN_TABLE = None
+# 盤面の値 -> パターンでの状態（黒を自分とする）
+_PATTERN_STATES = {BLACK: PATTERN_OWN, WHITE: PATTERN_OPPONENT, EMPTY: PATTERN_EMPTY, BORDER: PATTERN_EDGE}
+_PATTERN_SWAP = None
+
+
+def light_playout(size):
+    """盤面サイズごとに共有される LightPlayout を取得"""
+    playout = _PLAYOUTS.get(size)
+    if playout is None:
+        playout = LightPlayout(size)
+        _PLAYOUTS[size] = playout
+    return playout
+
+
+def heavy_playout(size):
+    """盤面サイズごと・スレッドごとに共有される HeavyPlayout を取得"""
+    playouts = getattr(_HEAVY_PLAYOUTS, "playouts", None)
+    if playouts is None:
+        playouts = _HEAVY_PLAYOUTS.playouts = {}
+    playout = playouts.get(size)
+    if playout is None:
+        playout = HeavyPlayout(size)
+        playouts[size] = playout
+    return playout
+
+
+def pattern_table():
+    """
+    3x3パターンの重み表を取得
+
+    周囲8点（上下左右、斜めの順。番兵付き盤面の neighbor_offsets・
+    diagonal_offsets と同じ並び）の状態を2bitずつ並べたパターン番号と、
+    上下左右の連がその点を最後の呼吸点とするアタリかどうかの4bitで引く。
+    全 4^8 通りの配置 × 16 通りのアタリをまとめてベクトル演算で求める。
+
+    Returns:
+        (4^8, 16) の np.uint8 配列（手番側から見た重み）
+    """
+    global _PATTERN_TABLE
+    if _PATTERN_TABLE is None:
+        codes = np.arange(4 ** 8)
+        states = (codes[:, None] >> (2 * np.arange(8))) & 3
+        orth, diag = states[:, :4], states[:, 4:]
+        atari = ((np.arange(16)[:, None] >> np.arange(4)) & 1).astype(bool)
+
+        # LightPlayout._is_eye と同じ眼の判定（眼には打たない）
+        surrounded = np.all((orth == PATTERN_OWN) | (orth == PATTERN_EDGE), axis=1)
+        enemies = np.sum(diag == PATTERN_OPPONENT, axis=1)
+        on_board = np.sum(diag != PATTERN_EDGE, axis=1)
+        eye = surrounded & np.where(on_board < 4, enemies == 0, enemies <= 1)
+
+        # 上下と左右の組とその間の斜め（下右, 下左, 上右, 上左）
+        pairs = [(0, 2, 0), (0, 3, 1), (1, 2, 2), (1, 3, 3)]
+        cut = np.zeros(len(codes), dtype=bool)
+        for a, b, d in pairs:
+            cut |= ((orth[:, a] == PATTERN_OPPONENT) & (orth[:, b] == PATTERN_OPPONENT)
+                    & (diag[:, d] != PATTERN_OPPONENT))
+        contact = (np.any(orth == PATTERN_OPPONENT, axis=1)
+                   & np.any(states == PATTERN_OWN, axis=1))
+
+        capture = np.any(atari[None, :, :] & (orth[:, None, :] == PATTERN_OPPONENT), axis=2)
+        save = np.any(atari[None, :, :] & (orth[:, None, :] == PATTERN_OWN), axis=2)
+
+        table = np.zeros((len(codes), 16), dtype=np.uint8)
+        table[contact] = PATTERN_WEIGHTS["contact"]
+        table[cut] = PATTERN_WEIGHTS["cut"]
+        table[save] = np.maximum(table[save], PATTERN_WEIGHTS["save"])
+        table[capture] = PATTERN_WEIGHTS["capture"]
+        table[eye] = 0
+        _PATTERN_TABLE = table
+    return _PATTERN_TABLE
+
+
+def pattern_swap():
+    """
+    パターン番号の自分と相手を入れ替える表
+
+    パターン表は手番側から見た値なので、盤面上の色（黒=自分）で
+    持っているパターン番号を白番で引くときに使う。
+
+    Returns:
+        (4^8,) の np.int32 配列
+    """
+    global _PATTERN_SWAP
+    if _PATTERN_SWAP is None:
+        codes = np.arange(4 ** 8)
+        states = (codes[:, None] >> (2 * np.arange(8))) & 3
+        swapped = np.choose(states, [PATTERN_EMPTY, PATTERN_OPPONENT, PATTERN_OWN, PATTERN_EDGE])
+        _PATTERN_SWAP = np.sum(swapped << (2 * np.arange(8)), axis=1).astype(np.int32)
+    return _PATTERN_SWAP
+
+
+class LightPlayout:
+    """
+    一様ランダムの軽いプレイアウト
+
+    盤面サイズごとの座標テーブルだけを持ち、run() のたびに作業用の
+    配列を盤面から作り直す。
+    """
+
+    def __init__(self, size):
+        """
+        Args:
+            size: 盤面サイズ
+        """
+        tables = padded_tables(size)
+        self.size = size
+        self.width = tables["width"]
+        self.points = tables["points"].tolist()
+        self.flat = tables["flat"].tolist()
+
+        num_cells = self.width * self.width
+        self.neighbors = [()] * num_cells
+        self.diagonals = [()] * num_cells
+        for p, ns, ds in zip(self.points, tables["neighbors"].tolist(), tables["diagonals"].tolist()):
+            self.neighbors[p] = tuple(ns)
+            self.diagonals[p] = tuple(ds)
+
+        self._empty_cells = [BORDER] * num_cells
+        for p in self.points:
+            self._empty_cells[p] = EMPTY
+
+    def run(self, board, color, komi, max_moves=None, passes=0, rng=random):
+        """
+        盤面から終局までランダムに打ち、結果を返す
+
+        Args:
+            board: 開始局面の盤面（Board / BitBoard。変更しない）
+            color: 次に打つ側
+            komi: コミ
+            max_moves: 最大手数（Noneなら 2*size*size）
+            passes: 開始局面までの連続パス数
+            rng: 乱数生成器（random モジュール互換）
+
+        Returns:
+            colorから見た結果（勝ち: 1, 負け: -1, 引き分け: 0）
+        """
+        if max_moves is None:
+            max_moves = 2 * self.size * self.size
+
+        player = color
+        cells = self._empty_cells[:]
+        num_cells = len(cells)
+        head = [-1] * num_cells
+        next_stone = list(range(num_cells))
+        libs = [0] * num_cells
+        empties = []
+        empty_pos = [-1] * num_cells
+
+        # 盤面を番兵付きの配列に写す
+        for f, c in enumerate(board.cells):
+            p = self.points[f]
+            if c == EMPTY:
+                empty_pos[p] = len(empties)
+                empties.append(p)
+            else:
+                cells[p] = c
+        for p in self.points:
+            if cells[p] != EMPTY and head[p] < 0:
+                self._build_string(cells, head, next_stone, libs, p)
+
+        ko = self.points[board.ko] if board.ko is not None else -1
+        for _ in range(max_moves):
+            p = self._choose_move(cells, head, libs, empties, empty_pos, ko, color, rng)
+            if p < 0:
+                passes += 1
+                if passes >= 2:
+                    break
+                ko = -1
+            else:
+                passes = 0
+                ko = self._play(cells, head, next_stone, libs, empties, empty_pos, p, color)
+            color = -color
+
+        return self._result(cells, player, komi)
+
+    def _build_string(self, cells, head, next_stone, libs, p):
+        """pを含む連の代表点・循環リスト・擬似呼吸点数を作る"""
+        neighbors = self.neighbors
+        color = cells[p]
+        stones = [p]
+        head[p] = p
+        for q in stones:
+            for n in neighbors[q]:
+                c = cells[n]
+                if c == EMPTY:
+                    libs[p] += 1
+                elif c == color and head[n] < 0:
+                    head[n] = p
+                    stones.append(n)
+        for a, b in zip(stones, stones[1:] + stones[:1]):
+            next_stone[a] = b
+
+    def _choose_move(self, cells, head, libs, empties, empty_pos, ko, color, rng):
+        """
+        打てる空点から一様にランダムに1つ選ぶ（打てる点がなければ -1 でパス）
+
+        打てない点は候補の末尾と入れ替えて候補から外し、残りから引き直す。
+        """
+        neighbors = self.neighbors
+        n = len(empties)
+        while n:
+            i = int(rng.random() * n)
+            p = empties[i]
+            if p != ko:
+                # 空きの隣接点があれば眼でも自殺手でもない（ほとんどの手はここで決まる）
+                a, b, c, d = neighbors[p]
+                if cells[a] == EMPTY or cells[b] == EMPTY or cells[c] == EMPTY or cells[d] == EMPTY:
+                    return p
+                if not self._is_eye(cells, p, color) and self._is_legal(cells, head, libs, p, color):
+                    return p
+            n -= 1
+            q = empties[n]
+            empties[i] = q
+            empties[n] = p
+            empty_pos[q] = i
+            empty_pos[p] = n
+        return -1
+
+    def _is_eye(self, cells, p, color):
+        """
+        pがcolorの眼（ロールアウトで埋めるべきでない点）かどうか
+
+        上下左右が全て自分の石か盤外で、斜めの相手の石が多すぎない（欠け眼
+        でない）点を眼とする。
+        """
+        for n in self.neighbors[p]:
+            c = cells[n]
+            if c != color and c != BORDER:
+                return False
+        enemies = 0
+        on_board = 0
+        for d in self.diagonals[p]:
+            c = cells[d]
+            if c == -color:
+                enemies += 1
+            if c != BORDER:
+                on_board += 1
+        if on_board < 4:
+            return enemies == 0
+        return enemies <= 1
+
+    def _is_legal(self, cells, head, libs, p, color):
+        """自殺手でないかどうか（空きの隣接点・呼吸点が残る連・取れる相手の連のいずれかがあれば合法）"""
+        neighbors = self.neighbors[p]
+        for n in neighbors:
+            c = cells[n]
+            if c == EMPTY:
+                return True
+            if c == BORDER:
+                continue
+            # 擬似呼吸点数からpとの隣接の分を引いて、他に呼吸点があるかを見る
+            h = head[n]
+            shared = 0
+            for m in neighbors:
+                if head[m] == h and cells[m] == c:
+                    shared += 1
+            if c == color:
+                if libs[h] > shared:
+                    return True
+            elif libs[h] == shared:
+                return True
+        return False
+
+    def _play(self, cells, head, next_stone, libs, empties, empty_pos, p, color):
+        """
+        pにcolorの石を置き、取れる相手の連を取り上げる
+
+        Returns:
+            新しいコウの点（なければ -1）
+        """
+        neighbors = self.neighbors
+        self._remove_empty(empties, empty_pos, p)
+        cells[p] = color
+        head[p] = p
+        next_stone[p] = p
+        libs[p] = 0
+
+        # 先に自分の連をつなぎ、その後で相手の連の呼吸点を減らして取り上げる
+        for n in neighbors[p]:
+            c = cells[n]
+            if c == EMPTY:
+                libs[head[p]] += 1
+            elif c == color:
+                h = head[n]
+                libs[h] -= 1
+                if h != head[p]:
+                    self._merge(head, next_stone, libs, head[p], h)
+
+        captured = 0
+        captured_point = -1
+        for n in neighbors[p]:
+            # 同じ連に2回隣接している場合、1回目で取り上げ済みなら空点になっている
+            if cells[n] == -color:
+                h = head[n]
+                libs[h] -= 1
+                if libs[h] == 0:
+                    captured += self._capture(cells, head, next_stone, libs, empties, empty_pos, h)
+                    captured_point = n
+
+        # 1子を取って自分も1子・呼吸点1ならコウ
+        h = head[p]
+        if captured == 1 and next_stone[p] == p and libs[h] == 1:
+            return captured_point
+        return -1
+
+    def _merge(self, head, next_stone, libs, a, b):
+        """代表点a・bの連をつなぐ（小さい方の代表点を付け替える）"""
+        size_a = size_b = 0
+        q = a
+        while True:
+            size_a += 1
+            q = next_stone[q]
+            if q == a:
+                break
+        q = b
+        while True:
+            size_b += 1
+            q = next_stone[q]
+            if q == b:
+                break
+        if size_a < size_b:
+            a, b = b, a
+        q = b
+        while True:
+            head[q] = a
+            q = next_stone[q]
+            if q == b:
+                break
+        libs[a] += libs[b]
+        next_stone[a], next_stone[b] = next_stone[b], next_stone[a]
+
+    def _capture(self, cells, head, next_stone, libs, empties, empty_pos, h):
+        """代表点hの連を取り上げ、取り上げた石数を返す"""
+        neighbors = self.neighbors
+        count = 0
+        q = h
+        while True:
+            cells[q] = EMPTY
+            count += 1
+            q = next_stone[q]
+            if q == h:
+                break
+        q = h
+        while True:
+            nq = next_stone[q]
+            head[q] = -1
+            next_stone[q] = q
+            empty_pos[q] = len(empties)
+            empties.append(q)
+            for n in neighbors[q]:
+                c = cells[n]
+                if c != EMPTY and c != BORDER:
+                    libs[head[n]] += 1
+            q = nq
+            if q == h:
+                break
+        return count
+
+    @staticmethod
+    def _remove_empty(empties, empty_pos, p):
+        """空点の配列からpを取り除く（末尾と入れ替えて O(1)）"""
+        i = empty_pos[p]
+        last = empties.pop()
+        if last != p:
+            empties[i] = last
+            empty_pos[last] = i
+        empty_pos[p] = -1
+
+    def _result(self, cells, color, komi):
+        """エリア方式の勝敗をcolorから見た値で返す"""
+        neighbors = self.neighbors
+        score = 0
+        for p in self.points:
+            c = cells[p]
+            if c == EMPTY:
+                # プレイアウト後の空点はほぼ眼なので、隣接が一色ならその色の地とする
+                owner = EMPTY
+                for n in neighbors[p]:
+                    nc = cells[n]
+                    if nc == BORDER:
+                        continue
+                    if owner == EMPTY:
+                        owner = nc
+                    elif nc != owner:
+                        owner = BORDER
+                        break
+                if owner == BLACK or owner == WHITE:
+                    score += owner
+            else:
+                score += c
+        score -= komi
+        if score == 0:
+            return 0
+        return 1 if (score > 0) == (color == BLACK) else -1
+
+
+class HeavyPlayout(LightPlayout):
+    """
+    3x3パターンの重みで手を選ぶ重いプレイアウト
+
+    空点ごとのパターン番号（周囲8点の色。黒を自分として持つ）を石の
+    配置・取り上げのたびに周囲8点だけ差分更新する。直前の手の周囲8点から
+    パターン表の重みに比例して手を選び、重みのある点がなければ
+    LightPlayout と同じ一様な選択をする。
+    """
+
+    def __init__(self, size):
+        super().__init__(size)
+        self.table = pattern_table()
+        self.swap = pattern_swap()
+
+        # 各点の石が変わったときに更新する (周囲の点, その点のパターンでのビット位置)
+        offsets = padded_tables(size)["neighbor_offsets"] + padded_tables(size)["diagonal_offsets"]
+        num_cells = self.width * self.width
+        self.pattern_updates = [()] * num_cells
+        self.surroundings = [()] * num_cells
+        for p in self.points:
+            self.pattern_updates[p] = tuple((p - offset, 2 * k) for k, offset in enumerate(offsets))
+            self.surroundings[p] = tuple(p + offset for offset in offsets)
+
+        self._codes = None
+        self._last = -1
+
+    def run(self, board, color, komi, max_moves=None, passes=0, rng=random):
+        # 番兵付き盤面での各点のパターン番号を作る
+        codes = [0] * (self.width * self.width)
+        for p in self.points:
+            code = 0
+            for k, q in enumerate(self.surroundings[p]):
+                f = self.flat[q]
+                c = BORDER if f < 0 else board.cells[f]
+                code |= _PATTERN_STATES[c] << (2 * k)
+            codes[p] = code
+        self._codes = codes
+        self._last = -1
+        try:
+            return super().run(board, color, komi, max_moves, passes, rng)
+        finally:
+            self._codes = None
+
+    def _choose_move(self, cells, head, libs, empties, empty_pos, ko, color, rng):
+        last = self._last
+        if last >= 0:
+            table, swap, codes = self.table, self.swap, self._codes
+            candidates = []
+            weights = []
+            total = 0
+            for p in self.surroundings[last]:
+                if cells[p] != EMPTY or p == ko:
+                    continue
+                code = codes[p] if color == BLACK else swap[codes[p]]
+                weight = int(table[code, self._atari_bits(cells, head, libs, p)])
+                if weight and self._is_legal(cells, head, libs, p, color):
+                    candidates.append(p)
+                    weights.append(weight)
+                    total += weight
+            if total:
+                r = rng.random() * total
+                for p, weight in zip(candidates, weights):
+                    r -= weight
+                    if r < 0:
+                        self._last = p
+                        return p
+                self._last = candidates[-1]
+                return candidates[-1]
+
+        p = super()._choose_move(cells, head, libs, empties, empty_pos, ko, color, rng)
+        self._last = p
+        return p
+
+    def _atari_bits(self, cells, head, libs, p):
+        """上下左右の連のうち、pを最後の呼吸点とするものを表す4bit"""
+        neighbors = self.neighbors[p]
+        bits = 0
+        for k, n in enumerate(neighbors):
+            c = cells[n]
+            if c == EMPTY or c == BORDER:
+                continue
+            h = head[n]
+            if libs[h] > 4:
+                # pとの隣接は高々4なので、擬似呼吸点が5以上ならアタリではない
+                continue
+            shared = 0
+            for m in neighbors:
+                if head[m] == h and cells[m] == c:
+                    shared += 1
+            if libs[h] == shared:
+                bits |= 1 << k
+        return bits
+
+    def _play(self, cells, head, next_stone, libs, empties, empty_pos, p, color):
+        ko = super()._play(cells, head, next_stone, libs, empties, empty_pos, p, color)
+        codes = self._codes
+        state = _PATTERN_STATES[color]
+        for q, shift in self.pattern_updates[p]:
+            codes[q] += state << shift
+        return ko
+
+    def _capture(self, cells, head, next_stone, libs, empties, empty_pos, h):
+        codes = self._codes
+        state = _PATTERN_STATES[cells[h]]
+        q = h
+        while True:
+            for r, shift in self.pattern_updates[q]:
+                codes[r] -= state << shift
+            q = next_stone[q]
+            if q == h:
+                break
+        return super()._capture(cells, head, next_stone, libs, empties, empty_pos, h)
+
+
+def benchmark_playout(board_size=9, seconds=2.0, heavy=False):
+    """
+    空盤からのプレイアウトの速度を計測
+
+    Args:
+        board_size: 盤面サイズ
+        seconds: 計測時間
+        heavy: HeavyPlayout を計測するか
+
+    Returns:
+        1秒あたりのプレイアウト数
+    """
+    import time
+
+    from .board import Board
+
+    board = Board(board_size)
+    playout = heavy_playout(board_size) if heavy else light_playout(board_size)
+    rng = random.Random(0)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        playout.run(board, BLACK, 6.5, rng=rng)
+        count += 1
+    rate = count / (time.perf_counter() - start)
+    print(f"{board_size}x{board_size}: {rate:.0f} プレイアウト/秒")
+    return rate
+
+
+if __name__ == "__main__":
+    benchmark_playout()
+    benchmark_playout(heavy=True)
@@ -0,0 +1,216 @@
+# go_engine/rules.py
+"""
+囲碁のルール判定
+
+取り上げ・自殺手・コウ（単純コウ＋ポジショナル超コウ）を扱う。
+判定は盤面が差分管理している連と呼吸点数を使い、着手点の周囲だけを
+見るため、盤面全体の走査は行わない。
+"""
+import numpy as np
+
+from .board import EMPTY, zobrist_table
+
+
+def position_key(board):
+    """
+    局面を識別するキー（超コウ判定用）
+
+    Args:
+        board: 盤面
+
+    Returns:
+        盤面の石の配置のZobristハッシュ
+    """
+    return board.zobrist_hash
+
+
+def captured_heads(board, p, color):
+    """
+    点pにcolorの石を打った場合に取り上げられる相手の連の代表点リスト
+
+    Args:
+        board: 盤面
+        p: 平坦インデックス
+        color: 着手する石の色
+
+    Returns:
+        取り上げられる連の代表点のリスト
+    """
+    cells = board.cells
+    heads = []
+    for n in board.adjacent[p]:
+        if cells[n] == -color and board.liberty_count(n) == 1:
+            h = board.string_head(n)
+            if h not in heads:
+                heads.append(h)
+    return heads
+
+
+def is_suicide(board, p, color):
+    """
+    点pへのcolorの着手が自殺手かどうか
+
+    Args:
+        board: 盤面
+        p: 平坦インデックス（空点）
+        color: 着手する石の色
+
+    Returns:
+        自殺手ならTrue
+    """
+    cells = board.cells
+    for n in board.adjacent[p]:
+        c = cells[n]
+        # 高速パス：隣に空点があれば呼吸点が残る
+        if c == EMPTY:
+            return False
+        liberties = board.liberty_count(n)
+        if c == color:
+            # 味方の連にp以外の呼吸点が残っていれば生きる
+            if liberties > 1:
+                return False
+        elif liberties == 1:
+            # 相手の連を取り上げられる
+            return False
+    return True
+
+
+def position_key_after(board, p, color):
+    """
+    点pにcolorの石を打った後の局面キーを計算（盤面は変更しない）
+
+    Args:
+        board: 盤面
+        p: 平坦インデックス
+        color: 着手する石の色
+
+    Returns:
+        着手後の局面キー
+    """
+    stones = zobrist_table(board.size)["stones"]
+    key = board.zobrist_hash ^ stones[color][p]
+    for h in captured_heads(board, p, color):
+        captured_keys = stones[-color]
+        for q in board.string_points(h):
+            key ^= captured_keys[q]
+    return key
+
+
+def is_legal(board, p, color, position_history=None):
+    """
+    点pへのcolorの着手が合法かどうか
+
+    Args:
+        board: 盤面
+        p: 平坦インデックス
+        color: 着手する石の色
+        position_history: 過去の局面キーの集合（Noneなら超コウ判定を省略）
+
+    Returns:
+        合法手ならTrue
+    """
+    if board.cells[p] != EMPTY:
+        return False
+
+    # 単純コウ
+    if p == board.ko:
+        return False
+
+    if is_suicide(board, p, color):
+        return False
+
+    # ポジショナル超コウ
+    if position_history is not None:
+        if position_key_after(board, p, color) in position_history:
+            return False
+
+    return True
+
+
+def play(board, p, color):
+    """
+    点pにcolorの石を打ち、取り上げとコウの更新を行う（合法性は呼び出し側で確認）
+
+    Args:
+        board: 盤面
+        p: 平坦インデックス
+        color: 着手する石の色
+
+    Returns:
+        取り上げた石の平坦インデックスのリスト
+    """
+    board.place(p, color)
+
+    captured = []
+    cells = board.cells
+    for n in board.adjacent[p]:
+        if cells[n] == -color and board.liberty_count(n) == 0:
+            captured.extend(board.remove_string(n))
+
+    # 1子を取って、打った石が1子・呼吸点1ならコウ
+    if (len(captured) == 1 and board.string_size(p) == 1
+            and board.liberty_count(p) == 1):
+        board.ko = captured[0]
+    else:
+        board.ko = None
+
+    return captured
+
+
+def _neighbor_any(mask):
+    """上下左右のいずれかの隣接点がTrueの点をTrueにした配列を返す"""
+    result = np.zeros_like(mask)
+    result[1:, :] |= mask[:-1, :]
+    result[:-1, :] |= mask[1:, :]
+    result[:, 1:] |= mask[:, :-1]
+    result[:, :-1] |= mask[:, 1:]
+    return result
+
+
+def legal_mask(board, color, position_history=None):
+    """
+    colorの合法手マスクを配列演算でまとめて計算
+
+    Args:
+        board: 盤面
+        color: 着手する石の色
+        position_history: 過去の局面キーの集合（Noneなら超コウ判定を省略）
+
+    Returns:
+        長さ size*size+1 のbool配列（最後の要素はパス）
+    """
+    grid = board.board
+    liberties = board.liberty_map()
+    empty = grid == EMPTY
+
+    # 自殺手でない条件：隣に空点・呼吸点が2以上の味方・アタリの相手のいずれかがある
+    enemy_atari = (grid == -color) & (liberties == 1)
+    breathing = empty | ((grid == color) & (liberties > 1)) | enemy_atari
+    legal = empty & _neighbor_any(breathing)
+
+    mask = np.ones(grid.size + 1, dtype=bool)
+    mask[:-1] = legal.reshape(-1)
+    if board.ko is not None:
+        mask[board.ko] = False
+
+    if position_history is not None:
+        _apply_superko(board, color, position_history, mask, _neighbor_any(enemy_atari))
+
+    return mask
+
+
+def _apply_superko(board, color, position_history, mask, capturing):
+    """合法手マスクから超コウで禁止される手を取り除く"""
+    points = np.flatnonzero(mask[:-1])
+    captures = capturing.reshape(-1)[points]
+
+    # 取り上げのない手は着手点のキーを足すだけで着手後のキーが求まる
+    quiet = points[~captures]
+    after = np.uint64(board.zobrist_hash) ^ zobrist_table(board.size)["stones_array"][color][quiet]
+    history = np.fromiter(position_history, dtype=np.uint64, count=len(position_history))
+    mask[quiet[np.isin(after, history)]] = False
+
+    # 取り上げのある手は少数なので個別に計算する
+    for p in points[captures].tolist():
+        if position_key_after(board, p, color) in position_history:
+            mask[p] = False
@@ -722,6 +722,23 @@ class AdvancedGoGUI:
             # AI vs AI の場合は次のAIの手
             if self.game_mode == "ai_vs_ai" and not self.game.game_over:
                 self.root.after(1000, self.ai_move)
+            else:
+                self.start_ai_pondering()
+    
+    def start_ai_pondering(self):
+        """人間の手番の間、AIに現在の局面を先読みさせる"""
+        if self.ai_player and self.game_mode == "human_vs_ai" and not self.game.game_over:
+            self.ai_player.start_pondering(self.game)
+    
+    def stop_ai_pondering(self):
+        """AIの先読みを止める（局面が入れ替わるとき）"""
+        if self.ai_player:
+            self.ai_player.stop_pondering()
+    
+    def close_ai_player(self):
+        """AIの先読みとプロセスプールを止める（AIを入れ替える・終了するとき）"""
+        if self.ai_player:
+            self.ai_player.close()
     
     def handle_ai_error(self, error_msg):
         """AIエラーの処理"""
@@ -754,6 +771,7 @@ class AdvancedGoGUI:
             current_player = "黒" if self.game.current_player == 1 else "白"
             winner = "白" if self.game.current_player == 1 else "黒"
             messagebox.showinfo("投了", f"{current_player}が投了しました\n{winner}の勝利です")
+            self.stop_ai_pondering()
             self.update_all_displays()
     
     def new_game(self):
@@ -762,6 +780,7 @@ class AdvancedGoGUI:
             if not messagebox.askyesno("確認", "現在のゲームを終了して新しいゲームを開始しますか？"):
                 return
                 
+        self.stop_ai_pondering()
         self.game = Game(self.board_size)
         self.ai_thinking = False
         self.game_start_time = time.time()
@@ -777,6 +796,8 @@ class AdvancedGoGUI:
         # AI vs AI の場合は自動開始
         if self.game_mode == "ai_vs_ai":
             self.root.after(1000, self.ai_move)
+        elif not self.should_ai_move():
+            self.start_ai_pondering()
     
     def on_mode_change(self):
         """ゲームモード変更"""
@@ -796,11 +817,8 @@ class AdvancedGoGUI:
     # 履歴管理
     def add_to_history(self):
         """現在の状態を履歴に追加"""
-        game_copy = Game(self.board_size)
-        game_copy.board.board = self.game.board.board.copy()
-        game_copy.current_player = self.game.current_player
-        game_copy.captured_stones = self.game.captured_stones.copy()
-        game_copy.game_over = self.game.game_over
+        # 手の履歴・局面履歴も含めて複製する（コピーオンライトなので手数によらず一定のコスト）
+        game_copy = self.game.clone()
         
         # 現在位置以降の履歴を削除
         self.game_history = self.game_history[:self.current_history_index + 1]
@@ -828,12 +846,11 @@ class AdvancedGoGUI:
     def restore_from_history(self):
         """履歴から状態を復元"""
         if 0 <= self.current_history_index < len(self.game_history):
+            self.stop_ai_pondering()
             history_game = self.game_history[self.current_history_index]
             
-            self.game.board.board = history_game.board.board.copy()
-            self.game.current_player = history_game.current_player
-            self.game.captured_stones = history_game.captured_stones.copy()
-            self.game.game_over = history_game.game_over
+            # 盤面だけでなく手の履歴・局面履歴も巻き戻す（超コウ判定や探索木の引き継ぎが使う）
+            self.game = history_game.clone()
             
             self.update_all_displays()
     
@@ -859,6 +876,10 @@ class AdvancedGoGUI:
         value = self.thinking_time_var.get()
         self.thinking_time_label.config(text=f"{value}秒")
         
+        # AIプレイヤーの設定を更新
+        if self.ai_player:
+            self.ai_player.time_limit = value
+        
     def update_all_displays(self):
         """全ての表示を更新"""
         self.update_board_display()
@@ -957,6 +978,7 @@ class AdvancedGoGUI:
     def load_ai_model(self):
         """AIモデルの読み込み"""
         model_path = "trained_models/final_model.pt"
+        self.close_ai_player()
         
         try:
             if os.path.exists(model_path):
@@ -965,16 +987,20 @@ class AdvancedGoGUI:
                 network.load_state_dict(checkpoint['model_state_dict'])
                 self.ai_player = MCTSPlayer(
                     network, 
-                    num_simulations=self.mcts_var.get()
+                    num_simulations=self.mcts_var.get(),
+                    time_limit=self.thinking_time_var.get(),
+                    ponder=True
                 )
                 self.ai_status_label.config(text="AIモデル: 学習済みモデル読み込み済み")
                 self.status_label.config(text="学習済みAI準備完了")
             else:
-                self.ai_player = MCTSPlayer(None, num_simulations=self.mcts_var.get())
+                self.ai_player = MCTSPlayer(None, num_simulations=self.mcts_var.get(),
+                                             time_limit=self.thinking_time_var.get(), ponder=True)
                 self.ai_status_label.config(text="AIモデル: ランダムAI使用中")
                 self.status_label.config(text="ランダムAI準備完了")
         except Exception as e:
-            self.ai_player = MCTSPlayer(None, num_simulations=self.mcts_var.get())
+            self.ai_player = MCTSPlayer(None, num_simulations=self.mcts_var.get(),
+                                        time_limit=self.thinking_time_var.get(), ponder=True)
             self.ai_status_label.config(text=f"AIモデル: エラー - {str(e)[:30]}...")
             self.status_label.config(text="AI読み込みエラー")
     
@@ -985,13 +1011,16 @@ class AdvancedGoGUI:
             filetypes=[("PyTorch models", "*.pt"), ("All files", "*.*")]
         )
         if filename:
+            self.close_ai_player()
             try:
                 network = ImprovedGoNeuralNetwork(board_size=self.board_size)
                 checkpoint = torch.load(filename, map_location='cpu')
                 network.load_state_dict(checkpoint['model_state_dict'])
                 self.ai_player = MCTSPlayer(
                     network, 
-                    num_simulations=self.mcts_var.get()
+                    num_simulations=self.mcts_var.get(),
+                    time_limit=self.thinking_time_var.get(),
+                    ponder=True
                 )
                 self.ai_status_label.config(text=f"AIモデル: {os.path.basename(filename)}")
                 self.status_label.config(text="新しいAIモデル読み込み完了")
@@ -1015,7 +1044,7 @@ class AdvancedGoGUI:
                     'board_size': self.board_size,
                     'board': self.game.board.board.tolist(),
                     'current_player': self.game.current_player,
-                    'move_history': getattr(self.game, 'move_history', []),
+                    'move_history': list(getattr(self.game, 'move_history', [])),
                     'captured_stones': self.game.captured_stones,
                     'game_over': self.game.game_over,
                     'total_moves': self.total_moves,
@@ -1240,6 +1269,7 @@ Developed with ❤️ for Go enthusiasts
     def run(self):
         """GUIの実行"""
         self.root.mainloop()
+        self.close_ai_player()
 
 
 def main():
@@ -3,6 +3,7 @@ import torch
 import argparse
 import os
 from go_engine.game import Game
+from go_engine import scoring
 from ai.network import ImprovedGoNeuralNetwork
 from ai.mcts import MCTSPlayer
 from ai.training import SelfPlayTrainingSystem
@@ -27,10 +28,10 @@ def human_vs_ai_game(model_path=None, board_size=9, mcts_simulations=400):
         network = ImprovedGoNeuralNetwork(board_size=board_size)
         checkpoint = torch.load(model_path, map_location='cpu')
         network.load_state_dict(checkpoint['model_state_dict'])
-        ai_player = MCTSPlayer(network, num_simulations=mcts_simulations)
+        ai_player = MCTSPlayer(network, num_simulations=mcts_simulations, ponder=True)
     else:
         print("⚠️ 学習済みモデルが見つかりません。ランダムAIを使用します。")
-        ai_player = MCTSPlayer(None, num_simulations=mcts_simulations)
+        ai_player = MCTSPlayer(None, num_simulations=mcts_simulations, ponder=True)
     
     # 人間が黒（先手）かどうかを選択
     while True:
@@ -61,9 +62,11 @@ def human_vs_ai_game(model_path=None, board_size=9, mcts_simulations=400):
                         (game.current_player == -1 and not human_is_black))
         
         if is_human_turn:
-            # 人間の手番
+            # 人間の手番（入力を待つ間もAIは先読みする）
+            ai_player.start_pondering(game)
             move = get_human_move(game)
             if move == "quit":
+                ai_player.close()
                 print("ゲームを終了します。")
                 return
         else:
@@ -83,6 +86,8 @@ def human_vs_ai_game(model_path=None, board_size=9, mcts_simulations=400):
             
         move_count += 1
     
+    ai_player.close()
+    
     # ゲーム終了
     print("\n🏁 ゲーム終了！")
     display_board_with_coordinates(game.board)
@@ -167,21 +172,19 @@ def display_board_with_coordinates(board):
                 print(" .", end=" ")
         print()
 
-def determine_and_display_winner(game):
-    """勝者を判定して表示"""
-    board = game.board.board
-    black_stones = (board == 1).sum()
-    white_stones = (board == -1).sum()
+def determine_and_display_winner(game, komi=scoring.DEFAULT_KOMI):
+    """勝者を判定して表示（エリア方式）"""
+    black_score, white_score = scoring.area_score(game.board)
+    result = black_score - white_score - komi
     
     print(f"\n📊 最終結果:")
-    print(f"黒石: {black_stones}")
-    print(f"白石: {white_stones}")
-    
-    # 簡易スコアリング
-    if black_stones > white_stones:
-        print("🏆 黒の勝利！")
-    elif white_stones > black_stones:
-        print("🏆 白の勝利！")
+    print(f"黒: {black_score}目")
+    print(f"白: {white_score}目 + コミ{komi}")
+    
+    if result > 0:
+        print(f"🏆 黒の勝利！（{result}目差）")
+    elif result < 0:
+        print(f"🏆 白の勝利！（{-result}目差）")
     else:
         print("🤝 引き分け！")
 
@@ -253,6 +256,9 @@ def ai_vs_ai_game(model1_path=None, model2_path=None, board_size=9,
             
         move_count += 1
     
+    player1.close()
+    player2.close()
+    
     # 最終結果
     print("\n🏁 ゲーム終了！")
     display_board_with_coordinates(game.board)
@@ -418,6 +424,9 @@ def quick_demo():
             print("デモ終了（30手）")
             break
     
+    player1.close()
+    player2.close()
+    
     print("\n🏁 デモ終了！")
     display_board_with_coordinates(game.board)
     determine_and_display_winner(game)
@@ -0,0 +1,27 @@
+# tests/test_board.py
+import copy
+import pickle
+
+import pytest
+
+from go_engine.board import Board, BLACK, WHITE
+from go_engine.bitboard import BitBoard
+
+
+@pytest.mark.parametrize("board_class", [Board, BitBoard])
+@pytest.mark.parametrize("duplicate", [copy.deepcopy, lambda b: pickle.loads(pickle.dumps(b))])
+def test_copy_keeps_flat_view(board_class, duplicate):
+    board = board_class(9)
+    board.place_stone(2, 2, WHITE)
+
+    copied = duplicate(board)
+    copied.place_stone(1, 1, BLACK)
+
+    # 複製の配列とその平坦ビューが同じ実体を指していること
+    assert copied.board[1, 1] == BLACK
+    assert copied.cells[copied.point(1, 1)] == BLACK
+    assert copied.board[2, 2] == WHITE
+    assert copied.liberty_map()[1, 1] == 4
+    # 元の盤面は変わらない
+    assert board.board[1, 1] == 0
+    assert board.cells[board.point(1, 1)] == 0
@@ -0,0 +1,57 @@
+# tests/test_mcts.py
+import time
+
+import numpy as np
+import pytest
+
+from ai.mcts import MCTS, MCTSPlayer
+from go_engine.game import Game
+
+
+def test_rollout_search_tries_every_root_child():
+    # ネットワークなしでは事前確率が一様なので、最初の子に探索が偏らないこと
+    game = Game(9)
+    mcts = MCTS(None, num_simulations=200, playout="light")
+    probs = mcts.search(game)
+
+    assert np.count_nonzero(probs) > 1
+    assert np.count_nonzero(probs[game.legal_mask()]) == int(game.legal_mask().sum())
+
+
+def test_reused_tree_requires_matching_position():
+    game = Game(9)
+    game.make_move((2, 2))
+    mcts = MCTS(None, num_simulations=50, playout="light", reuse_tree=True)
+    mcts.search(game)
+
+    # 手を進めただけなら、その手の先の部分木を引き継ぐ
+    advanced = game.clone()
+    advanced.make_move((0, 0))
+    assert mcts._reused_tree(advanced) is not None
+
+    # 手の履歴を戻さずに盤面だけ差し替えた局面には引き継がない
+    replaced = game.clone()
+    replaced.board.board = np.zeros((9, 9), dtype=np.int8)
+    assert mcts._reused_tree(replaced) is None
+
+
+def test_pondering_adds_visits_to_stored_tree():
+    game = Game(9)
+    player = MCTSPlayer(None, num_simulations=20, ponder=True)
+    try:
+        player.start_pondering(game)
+        time.sleep(0.5)
+        player.stop_pondering()
+
+        tree = player.mcts._reused_tree(game)
+        assert tree is not None
+        assert tree.visits[0] > 0
+    finally:
+        player.close()
+
+
+def test_ponder_with_root_parallel_search_warns():
+    with pytest.warns(RuntimeWarning):
+        player = MCTSPlayer(None, num_simulations=20, num_processes=2, ponder=True)
+    assert not player.ponder
+    player.close()